@@ -11,12 +11,11 @@
 # LICENSE file.
 
 import os
-import platform
+import sys
 import threading
 
 from abc import ABCMeta
 from contextlib import contextmanager
-from collections import OrderedDict
 
 import bitcointx.core
 import bitcointx.core.script
@@ -31,6 +30,32 @@ __version__ = '1.0.2.dev0'
 _thread_local = threading.local()
 
 
+def _make_attributes_validator(required_attributes):
+    """Generate a function that checks the attributes in the namespace
+    of the class being created against the required_attributes spec.
+    The checks are unrolled into straight-line code, so that class
+    creation does not need to loop over the spec and unpack it
+    each time."""
+    namespace = {}
+    lines = ['def validate(cls_name, dct):']
+    for i, (attr_name, checkfn, checkarg) in enumerate(required_attributes):
+        namespace['checkfn{}'.format(i)] = checkfn
+        namespace['checkarg{}'.format(i)] = checkarg
+        namespace['errmsg{}'.format(i)] = (
+            '{{}}.{} failed {} check against {}'
+            .format(attr_name, checkfn.__name__, checkarg.__name__))
+        # If the attribute is not in dct, it will be inherited
+        # from the base class
+        lines.append(
+            '    if {0!r} in dct and not checkfn{1}(dct[{0!r}], checkarg{1}):'
+            .format(attr_name, i))
+        lines.append(
+            '        raise TypeError(errmsg{}.format(cls_name))'.format(i))
+    lines.append('    return')
+    exec('\n'.join(lines), namespace)
+    return namespace['validate']
+
+
 class ChainParamsMeta(ABCMeta):
     _required_attributes = (
         ('NAME', isinstance, str),
@@ -38,8 +63,13 @@ class ChainParamsMeta(ABCMeta):
         ('WALLET_DISPATCHER', issubclass,
          bitcointx.wallet.WalletCoinClassDispatcher),
     )
-    _registered_classes = OrderedDict()
+    _required_attribute_names = frozenset(
+        attr_name for attr_name, _, _ in _required_attributes)
+    _validate_attributes = staticmethod(
+        _make_attributes_validator(_required_attributes))
+    _registered_classes = {}
     _common_base_cls = None
+    _instance_cache = {}
 
     def __new__(cls, cls_name, bases, dct, name=None):
         """check that the chainparams class uses unique base class
@@ -49,20 +79,15 @@ class ChainParamsMeta(ABCMeta):
         a table for lookup by name."""
         cls_instance = super().__new__(cls, cls_name, bases, dct)
 
-        if len(bases):
+        if bases:
             if not any(issubclass(b, cls._common_base_cls) for b in bases):
                 raise TypeError(
                     '{} must be a subclass of {}'.format(
                         cls_name, cls._common_base_cls.__name__))
-            for attr_name, checkfn, checkarg in cls._required_attributes:
-                if attr_name not in dct:
-                    # Attribute will be inherited from the base class
-                    continue
-                if not checkfn(dct[attr_name], checkarg):
-                    raise TypeError(
-                        '{}.{} failed {} check against {}'
-                        .format(cls_name, attr_name, checkfn.__name__,
-                                checkarg.__name__))
+            # Attributes that the class does not set itself are inherited,
+            # and were already checked when the base class was created
+            if not cls._required_attribute_names.isdisjoint(dct):
+                cls._validate_attributes(cls_name, dct)
 
             if name is not None:
                 if isinstance(name, str):
@@ -90,8 +115,44 @@ class ChainParamsMeta(ABCMeta):
                                                cls._common_base_cls))
             cls._common_base_cls = cls_instance
 
+        if getattr(cls_instance, 'NAME', None) is not None:
+            # NAME is constant for the class, split it once here rather
+            # than in each method that needs its parts
+            cls_instance._name_parts = tuple(cls_instance.NAME.split('/'))
+
         return cls_instance
 
+    def __init_subclass__(mcs, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if '_required_attributes' in mcs.__dict__:
+            mcs._required_attribute_names = frozenset(
+                attr_name for attr_name, _, _ in mcs._required_attributes)
+            mcs._validate_attributes = staticmethod(
+                _make_attributes_validator(mcs._required_attributes))
+
+    def __call__(cls, *args, **kwargs):
+        """Return the same instance when the chain params class
+        is instantiated with the same keyword arguments, so that switching
+        between chains does not need to create new instances.
+
+        Note that the instances are shared: any change made to the instance
+        will be seen by everyone who gets the instance of this class
+        with the same arguments. Instances created with positional
+        arguments are not cached."""
+        if args:
+            return super().__call__(*args, **kwargs)
+
+        key = (cls, tuple(sorted(kwargs.items())))
+        try:
+            return cls._instance_cache[key]
+        except KeyError:
+            inst = super().__call__(**kwargs)
+            cls._instance_cache[key] = inst
+            return inst
+        except TypeError:
+            # Some of the arguments are not hashable, cannot cache
+            return super().__call__(**kwargs)
+
 
 def find_chain_params(*, name=None):
     return ChainParamsMeta._registered_classes.get(name)
@@ -111,19 +172,19 @@ class ChainParamsBase(metaclass=ChainParamsMeta):
 
     def get_confdir_path(self):
         """Return default location for config directory"""
-        name = self.NAME.split('/')[0]
+        name = self._name_parts[0]
 
-        if platform.system() == 'Darwin':
+        if sys.platform == 'darwin':
             return os.path.expanduser(
                 '~/Library/Application Support/{}'.format(name.capitalize()))
-        elif platform.system() == 'Windows':
+        elif sys.platform == 'win32':
             return os.path.join(os.environ['APPDATA'], name.capitalize())
 
         return os.path.expanduser('~/.{}'.format(name))
 
     def get_config_path(self):
         """Return default location for config file"""
-        name = self.NAME.split('/')[0]
+        name = self._name_parts[0]
         return '{}/{}.conf'.format(self.get_confdir_path(), name)
 
     def get_datadir_extra_name(self):
@@ -131,10 +192,9 @@ class ChainParamsBase(metaclass=ChainParamsMeta):
         and .cookie file. For mainnet, it will be an empty string -
         because data directory is the same as config directory.
         For others, like testnet or regtest, it will differ."""
-        name_parts = self.NAME.split('/')
-        if len(name_parts) == 1:
+        if len(self._name_parts) == 1:
             return ''
-        return name_parts[1]
+        return self._name_parts[1]
 
     @property
     def name(self):
@@ -142,9 +202,8 @@ class ChainParamsBase(metaclass=ChainParamsMeta):
 
     @property
     def readable_name(self):
-        name_parts = self.NAME.split('/')
-        name_parts[0] = name_parts[0].capitalize()
-        return ' '.join(name_parts)
+        name_parts = self._name_parts
+        return ' '.join((name_parts[0].capitalize(), ) + name_parts[1:])
 
 
 class BitcoinMainnetParams(ChainParamsBase,
@@ -163,6 +222,16 @@ class BitcoinRegtestParams(BitcoinMainnetParams, name='bitcoin/regtest'):
     WALLET_DISPATCHER = bitcointx.wallet.WalletBitcoinRegtestClassDispatcher
 
 
+# Instances of the built-in chain params, by each of their registered names,
+# so that selecting a built-in chain by name is a simple lookup
+_default_instances = {
+    name: params_cls()
+    for name, params_cls in ChainParamsMeta._registered_classes.items()
+    if params_cls in (BitcoinMainnetParams, BitcoinTestnetParams,
+                      BitcoinRegtestParams)
+}
+
+
 def get_current_chain_params():
     return _thread_local.params
 
@@ -190,15 +259,22 @@ def select_chain_params(params, **kwargs):
     that are thread-local, so changing chain parameters is thread-safe.
     """
 
+    # Each branch leaves params as a ChainParamsBase instance,
+    # so there's no need to check the result again afterwards
     if isinstance(params, str):
-        params_cls = find_chain_params(name=params)
-        if params_cls is None:
-            raise ValueError('Unknown chain %r' % params)
-        params = params_cls(**kwargs)
+        inst = None if kwargs else _default_instances.get(params)
+        if inst is None:
+            params_cls = find_chain_params(name=params)
+            if params_cls is None:
+                raise ValueError('Unknown chain %r' % params)
+            inst = params_cls(**kwargs)
+        params = inst
     elif isinstance(params, type):
+        if not issubclass(params, ChainParamsBase):
+            raise ValueError('Supplied chain params is not a subclass of '
+                             'ChainParamsBase')
         params = params(**kwargs)
-
-    if not isinstance(params, ChainParamsBase):
+    elif not isinstance(params, ChainParamsBase):
         raise ValueError('Supplied chain params is not a subclass of '
                          'ChainParamsBase')
 
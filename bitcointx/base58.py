@@ -15,12 +15,26 @@
 
 """Base58 encoding and decoding"""
 
-import binascii
+import functools
 
 import bitcointx.core
+from bitcointx.core import Hash, b2x
 
 B58_DIGITS = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
 
+# All two-digit combinations, indexed by their value (0 to 58*58-1).
+# Used by encode() to produce two digits per bignum division,
+# halving the number of iterations of the conversion loop.
+_B58_DIGIT_PAIRS = tuple(a + b for a in B58_DIGITS for b in B58_DIGITS)
+_B58_PAIR_BASE = len(_B58_DIGIT_PAIRS)
+
+# Maps a byte value of an ascii character to the value of base58 digit,
+# or to 0xFF if the character is not a valid base58 digit.
+_B58_DIGIT_LOOKUP = bytearray(b'\xff' * 256)
+for _i, _c in enumerate(B58_DIGITS):
+    _B58_DIGIT_LOOKUP[ord(_c)] = _i
+del _i, _c
+
 
 class Base58Error(bitcointx.core.AddressDataEncodingError):
     pass
@@ -44,24 +58,27 @@ class InvalidBase58Error(Base58Error):
 def encode(b):
     """Encode bytes to a base58-encoded string"""
 
+    # Accept any object that supports the buffer protocol, as hexlify()
+    # did. int.from_bytes() would also accept an iterable of ints,
+    # and lstrip() below is not available on memoryview.
+    if type(b) is not bytes:
+        b = memoryview(b).tobytes()
+
     # Convert big-endian bytes to integer
-    n = int('0x0' + binascii.hexlify(b).decode('utf8'), 16)
+    n = int.from_bytes(b, 'big')
 
-    # Divide that integer into bas58
+    # Divide that integer into base58, two digits at a time.
+    # The most significant pair may have a zero digit in front,
+    # that is not a part of the number, and must be stripped.
     res = []
     while n > 0:
-        n, r = divmod(n, 58)
-        res.append(B58_DIGITS[r])
-    res = ''.join(res[::-1])
+        n, r = divmod(n, _B58_PAIR_BASE)
+        res.append(_B58_DIGIT_PAIRS[r])
+    res.reverse()
+    res = ''.join(res).lstrip(B58_DIGITS[0])
 
     # Encode leading zeros as base58 zeros
-    czero = 0
-    pad = 0
-    for c in b:
-        if c == czero:
-            pad += 1
-        else:
-            break
+    pad = len(b) - len(b.lstrip(b'\x00'))
     return B58_DIGITS[0] * pad + res
 
 
@@ -70,31 +87,59 @@ def decode(s):
     if not s:
         return b''
 
-    # Convert the string to an integer
-    n = 0
-    for c in s:
-        n *= 58
-        if c not in B58_DIGITS:
-            raise InvalidBase58Error('Character %r is not a valid base58 character' % c)
-        digit = B58_DIGITS.index(c)
-        n += digit
+    try:
+        s_bytes = s.encode('ascii')
+    except UnicodeEncodeError as e:
+        raise InvalidBase58Error('Character %r is not a valid base58 character' % s[e.start])
+
+    # Map the characters to digit values, and check them all at once
+    digits = s_bytes.translate(_B58_DIGIT_LOOKUP)
+    bad_pos = digits.find(0xFF)
+    if bad_pos >= 0:
+        raise InvalidBase58Error('Character %r is not a valid base58 character' % chr(s_bytes[bad_pos]))
+
+    # Convert the digits to an integer, two digits at a time.
+    # With odd number of digits, the first one is taken alone.
+    digits_iter = iter(digits)
+    n = next(digits_iter) if len(digits) % 2 else 0
+    for digit in digits_iter:
+        n = n * _B58_PAIR_BASE + digit * 58 + next(digits_iter)
 
     # Convert the integer to bytes
-    h = '%x' % n
-    if len(h) % 2:
-        h = '0' + h
-    res = binascii.unhexlify(h.encode('utf8'))
+    res = n.to_bytes((n.bit_length() + 7) // 8, 'big')
 
     # Add padding back.
-    pad = 0
-    for c in s[:-1]:
-        if c == B58_DIGITS[0]:
-            pad += 1
-        else:
-            break
+    pad = len(s_bytes) - len(s_bytes.lstrip(b'1'))
     return b'\x00' * pad + res
 
 
+class _PrefixTable(dict):
+    """A mapping from base58 prefix to the candidate class
+    that has this prefix, with the lengths of the prefixes
+    stored as prefix_lengths attribute"""
+
+
+@functools.lru_cache(maxsize=128)
+def _get_prefix_table(candidates):
+    """Build the table to look up the candidate class by prefix, so that
+    base58_match_prefix() does not need to compare the data to each
+    candidate's prefix in turn. Return None if the lookup could give
+    a different result than sequential comparison: when some candidate
+    has no prefix and needs to do its own matching, or when
+    one prefix is a beginning of another."""
+    table = _PrefixTable()
+    for candidate in candidates:
+        pfx = candidate.base58_prefix
+        if not pfx:
+            return None
+        for other_pfx in table:
+            if pfx.startswith(other_pfx) or other_pfx.startswith(pfx):
+                return None
+        table[pfx] = candidate
+    table.prefix_lengths = tuple(sorted(set(len(pfx) for pfx in table)))
+    return table
+
+
 class Base58ChecksumError(Base58Error):
     """Raised on Base58 checksum errors"""
     pass
@@ -114,10 +159,10 @@ class CBase58Data(bytes):
         k = decode(s)
         if len(k) < 4:
             raise Base58Error('data too short')
-        data, check0 = k[0:-4], k[-4:]
-        check1 = bitcointx.core.Hash(data)[:4]
-        if check0 != check1:
-            raise Base58ChecksumError('Checksum mismatch: expected %r, calculated %r' % (check0, check1))
+        data = k[:-4]
+        check1 = Hash(data)[:4]
+        if not k.endswith(check1):
+            raise Base58ChecksumError('Checksum mismatch: expected %r, calculated %r' % (k[-4:], check1))
         return cls.base58_match_prefix(data)
 
     def __init__(self, s):
@@ -130,8 +175,22 @@ class CBase58Data(bytes):
 
     def __str__(self):
         """Convert to string"""
-        check = bitcointx.core.Hash(self.base58_prefix + self)[0:4]
-        return encode(self.base58_prefix + self + check)
+        # The instance is immutable, so the string representation
+        # can be computed once and then reused. The prefix is taken
+        # from the class, and can be changed after the string was
+        # computed, so the string is cached together with the prefix.
+        prefix = self.base58_prefix
+        try:
+            cached_prefix, cached_str = self._cached_str
+            if cached_prefix == prefix:
+                return cached_str
+        except AttributeError:
+            pass
+
+        check = Hash(prefix + self)[0:4]
+        result = encode(prefix + self + check)
+        self._cached_str = (prefix, result)
+        return result
 
     @classmethod
     def base58_get_match_candidates(cls):
@@ -147,6 +206,16 @@ class CBase58Data(bytes):
         if not candidates:
             return cls.from_bytes(data)
 
+        prefix_table = _get_prefix_table(tuple(candidates))
+        if prefix_table is not None:
+            for pfx_len in prefix_table.prefix_lengths:
+                pfx = data[:pfx_len]
+                candidate = prefix_table.get(pfx)
+                # base58_prefix might have been changed after the table
+                # was built. In this case, fall back to sequential matching
+                if candidate is not None and candidate.base58_prefix == pfx:
+                    return candidate.from_bytes(data[pfx_len:])
+
         for candidate in candidates:
             pfx = candidate.base58_prefix
             if not pfx:
@@ -161,10 +230,10 @@ class CBase58Data(bytes):
             raise UnexpectedBase58PrefixError(
                 'Incorrect prefix bytes for {}: {}, expected {}'
                 .format(cls.__name__,
-                        bitcointx.core.b2x(pfx),
-                        bitcointx.core.b2x(cls.base58_prefix)))
+                        b2x(pfx),
+                        b2x(cls.base58_prefix)))
 
-        raise bitcointx.base58.UnexpectedBase58PrefixError(
+        raise UnexpectedBase58PrefixError(
             'base58 prefix does not match any known base58 address class')
 
     @classmethod
@@ -419,7 +419,7 @@ class Uint256(_UintBitVector):
 
 class COutPoint(CoreCoinClass, next_dispatch_final=True):
     """The combination of a transaction hash and an index n into its vout"""
-    __slots__ = ['hash', 'n']
+    __slots__ = ['hash', 'n', '_cached_hash_hex']
 
     def __init__(self, hash=b'\x00'*32, n=0xffffffff):
         if not len(hash) == 32:
@@ -446,6 +446,18 @@ class COutPoint(CoreCoinClass, next_dispatch_final=True):
     def is_null(self):
         return ((self.hash == b'\x00'*32) and (self.n == 0xffffffff))
 
+    def _hash_hex(self):
+        """Return the hash as little-endian hex string. For immutable
+        instances with bytes hash, the string is computed only once"""
+        if self.is_mutable() or type(self.hash) is not bytes:
+            return b2lx(self.hash)
+        try:
+            return self._cached_hash_hex
+        except AttributeError:
+            _cached_hash_hex = b2lx(self.hash)
+            object.__setattr__(self, '_cached_hash_hex', _cached_hash_hex)
+            return _cached_hash_hex
+
     def __repr__(self):
         if self.is_null():
             return '%s()' % (
@@ -454,10 +466,10 @@ class COutPoint(CoreCoinClass, next_dispatch_final=True):
         else:
             return '%s(lx(%r), %i)' % (
                 self.__class__.__name__,
-                b2lx(self.hash), self.n)
+                self._hash_hex(), self.n)
 
     def __str__(self):
-        return '%s:%i' % (b2lx(self.hash), self.n)
+        return '%s:%i' % (self._hash_hex(), self.n)
 
     @classmethod
     def clone_from_instance(cls, other):
@@ -755,7 +767,8 @@ class CBitcoinMutableTxWitness(CBitcoinTxWitness, CMutableTxWitness,
 
 
 class CTransaction(ReprOrStrMixin, CoreCoinClass, next_dispatch_final=True):
-    __slots__ = ['nVersion', 'vin', 'vout', 'nLockTime', 'wit']
+    __slots__ = ['nVersion', 'vin', 'vout', 'nLockTime', 'wit',
+                 '_cached_virtual_size', '_cached_bip143_tx_hashes']
 
     CURRENT_VERSION = 2
 
@@ -888,6 +901,12 @@ class CTransaction(ReprOrStrMixin, CoreCoinClass, next_dispatch_final=True):
 
         see docstring for `calculate_transaction_virtual_size()`
         for more detailed explanation."""
+        if self.is_immutable():
+            try:
+                return self._cached_virtual_size
+            except AttributeError:
+                pass
+
         f = BytesIO()
         for vin in self.vin:
             vin.stream_serialize(f)
@@ -903,13 +922,18 @@ class CTransaction(ReprOrStrMixin, CoreCoinClass, next_dispatch_final=True):
             self.wit.stream_serialize(f)
             witness_size = len(f.getbuffer())
 
-        return calculate_transaction_virtual_size(
+        vsize = calculate_transaction_virtual_size(
             num_inputs=len(self.vin),
             inputs_serialized_size=inputs_size,
             num_outputs=len(self.vout),
             outputs_serialized_size=outputs_size,
             witness_size=witness_size)
 
+        if self.is_immutable():
+            object.__setattr__(self, '_cached_virtual_size', vsize)
+
+        return vsize
+
 
 class CMutableTransaction(CTransaction, mutable_of=CTransaction,
                           next_dispatch_final=True):
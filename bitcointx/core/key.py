@@ -28,12 +28,14 @@ import hashlib
 from bitcointx.util import no_bool_use_as_property
 from bitcointx.core import Hash160
 from bitcointx.core.secp256k1 import (
-    _secp256k1, secp256k1_context_sign, secp256k1_context_verify,
+    _secp256k1, _secp256k1_scratch,
+    secp256k1_context_sign, secp256k1_context_verify,
     SIGNATURE_SIZE, COMPACT_SIGNATURE_SIZE,
     PUBLIC_KEY_SIZE, COMPRESSED_PUBLIC_KEY_SIZE,
     SECP256K1_EC_COMPRESSED, SECP256K1_EC_UNCOMPRESSED,
     secp256k1_has_pubkey_recovery, secp256k1_has_ecdh,
-    secp256k1_has_privkey_negate, secp256k1_has_pubkey_negate
+    secp256k1_has_privkey_negate, secp256k1_has_pubkey_negate,
+    secp256k1_ecdsa_verify_many
 )
 
 BIP32_HARDENED_KEY_OFFSET = 0x80000000
@@ -139,15 +141,16 @@ class CKeyBase():
         if len(hash) != 32:
             raise ValueError('Hash must be exactly 32 bytes long')
 
-        raw_sig = ctypes.create_string_buffer(64)
+        scratch = _secp256k1_scratch
+        raw_sig = scratch.raw_sig
         result = _secp256k1.secp256k1_ecdsa_sign(
             secp256k1_context_sign, raw_sig, hash, self.secret_bytes, None, None)
         assert 1 == result
-        sig_size0 = ctypes.c_size_t()
+        sig_size0 = scratch.der_sig_size
         sig_size0.value = SIGNATURE_SIZE
-        mb_sig = ctypes.create_string_buffer(sig_size0.value)
+        mb_sig = scratch.der_sig
         result = _secp256k1.secp256k1_ecdsa_signature_serialize_der(
-            secp256k1_context_sign, mb_sig, ctypes.byref(sig_size0), raw_sig)
+            secp256k1_context_sign, mb_sig, scratch.der_sig_size_ref, raw_sig)
         assert 1 == result
         # secp256k1 creates signatures already in lower-S form, no further
         # conversion needed.
@@ -277,9 +280,9 @@ class CPubKey(bytes):
 
         self._fullyvalid = False
         if self.is_valid():
-            tmp_pub = ctypes.create_string_buffer(64)
             result = _secp256k1.secp256k1_ec_pubkey_parse(
-                secp256k1_context_verify, tmp_pub, self, len(self))
+                secp256k1_context_verify, _secp256k1_scratch.raw_pubkey,
+                self, len(self))
             self._fullyvalid = (result == 1)
 
         self.key_id = Hash160(self)
@@ -371,7 +374,8 @@ class CPubKey(bytes):
         if not self.is_fullyvalid():
             return False
 
-        raw_sig = ctypes.create_string_buffer(64)
+        scratch = _secp256k1_scratch
+        raw_sig = scratch.raw_sig
         result = _secp256k1.secp256k1_ecdsa_signature_parse_der(
             secp256k1_context_verify, raw_sig, sig, len(sig))
 
@@ -382,7 +386,10 @@ class CPubKey(bytes):
         _secp256k1.secp256k1_ecdsa_signature_normalize(
             secp256k1_context_verify, raw_sig, raw_sig)
 
-        raw_pub = self._to_raw()
+        raw_pub = scratch.raw_pubkey
+        result = _secp256k1.secp256k1_ec_pubkey_parse(
+            secp256k1_context_verify, raw_pub, self, len(self))
+        assert 1 == result
         result = _secp256k1.secp256k1_ecdsa_verify(
             secp256k1_context_verify, raw_sig, hash, raw_pub)
 
@@ -481,6 +488,106 @@ class CPubKey(bytes):
         return cls.add(a, b.negated())
 
 
+class SignatureBatch:
+    """Collect DER signatures together with their message hashes and public
+    keys, to verify them all at once with verify_all().
+
+    Signatures and public keys are parsed when they are added, and each
+    distinct signature or public key is parsed only once, even if it is
+    added many times (like the same pubkey in multisig checks).
+    The result for each signature is the same as CPubKey.verify() would
+    give for it.
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._parsed_sigs = {}
+        self._parsed_pubs = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _parse_sig(self, sig):
+        try:
+            return self._parsed_sigs[sig]
+        except KeyError:
+            pass
+
+        raw_sig = None
+        if sig:
+            buf = ctypes.create_string_buffer(64)
+            result = _secp256k1.secp256k1_ecdsa_signature_parse_der(
+                secp256k1_context_verify, buf, sig, len(sig))
+            if result == 1:
+                _secp256k1.secp256k1_ecdsa_signature_normalize(
+                    secp256k1_context_verify, buf, buf)
+                raw_sig = buf.raw
+            else:
+                assert result == 0
+
+        self._parsed_sigs[sig] = raw_sig
+        return raw_sig
+
+    def _parse_pub(self, pub):
+        try:
+            return self._parsed_pubs[pub]
+        except KeyError:
+            pass
+
+        raw_pub = None
+        if pub:
+            buf = ctypes.create_string_buffer(64)
+            result = _secp256k1.secp256k1_ec_pubkey_parse(
+                secp256k1_context_verify, buf, pub, len(pub))
+            if result == 1:
+                raw_pub = buf.raw
+            else:
+                assert result == 0
+
+        self._parsed_pubs[pub] = raw_pub
+        return raw_pub
+
+    def add(self, sig, hash, pub): # pylint: disable=redefined-builtin
+        """Add DER-encoded signature sig of 32-byte hash by public key pub"""
+        if not isinstance(sig, (bytes, bytearray)):
+            raise TypeError('Signature must be bytes or bytearray instance; '
+                            'got %r' % sig.__class__)
+        if not isinstance(hash, (bytes, bytearray)):
+            raise TypeError('Hash must be bytes or bytearray instance; got %r'
+                            % hash.__class__)
+        if len(hash) != 32:
+            raise ValueError('Hash must be exactly 32 bytes long')
+        if not isinstance(pub, (bytes, bytearray)):
+            raise TypeError('Pubkey must be bytes or bytearray instance; '
+                            'got %r' % pub.__class__)
+
+        self._entries.append((self._parse_sig(bytes(sig)), bytes(hash),
+                              self._parse_pub(bytes(pub))))
+
+    def verify_all(self):
+        """Verify all the signatures added to the batch.
+        Return the list of bools, one for each signature,
+        in the order they were added"""
+        results = [False] * len(self._entries)
+        indexes = []
+        sigs = []
+        hashes = []
+        pubs = []
+        for i, (raw_sig, hash, raw_pub) in enumerate(self._entries):
+            if raw_sig is not None and raw_pub is not None:
+                indexes.append(i)
+                sigs.append(raw_sig)
+                hashes.append(hash)
+                pubs.append(raw_pub)
+
+        verified = secp256k1_ecdsa_verify_many(
+            secp256k1_context_verify, sigs, hashes, pubs)
+        for i, result in zip(indexes, verified):
+            results[i] = result
+
+        return results
+
+
 class CExtKeyCommonBase():
 
     def _check_length(self):
@@ -822,5 +929,6 @@ __all__ = (
     'CKeyBase',
     'CExtKeyBase',
     'CExtPubKeyBase',
-    'BIP32Path'
+    'BIP32Path',
+    'SignatureBatch',
 )
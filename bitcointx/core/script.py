@@ -593,6 +593,18 @@ class CScriptTruncatedPushDataError(CScriptInvalidError):
         super().__init__(msg)
 
 
+# The fixed parts of the standard scriptPubKey templates. The code that
+# creates scriptPubKeys puts the hash between them, instead of encoding
+# the script from the list of opcodes and data each time.
+# Also used by the address classes in bitcointx.wallet
+_P2SH_SPK_PREFIX = bytes([OP_HASH160, 20])
+_P2SH_SPK_SUFFIX = bytes([OP_EQUAL])
+_P2PKH_SPK_PREFIX = bytes([OP_DUP, OP_HASH160, 20])
+_P2PKH_SPK_SUFFIX = bytes([OP_EQUALVERIFY, OP_CHECKSIG])
+_P2WPKH_SPK_PREFIX = bytes([0, 20])
+_P2WSH_SPK_PREFIX = bytes([0, 32])
+
+
 class CScript(bytes, ScriptCoinClass, next_dispatch_final=True):
     """Serialized script
 
@@ -909,7 +921,8 @@ class CScript(bytes, ScriptCoinClass, next_dispatch_final=True):
         """
         if checksize and len(self) > MAX_SCRIPT_ELEMENT_SIZE:
             raise ValueError("redeemScript exceeds max allowed size; P2SH output would be unspendable")
-        return self.__class__([OP_HASH160, bitcointx.core.Hash160(self), OP_EQUAL])
+        return self.__class__(_P2SH_SPK_PREFIX + bitcointx.core.Hash160(self)
+                              + _P2SH_SPK_SUFFIX)
 
     def to_p2wsh_scriptPubKey(self, checksize=True):
         """Create P2WSH scriptPubKey from this redeemScript
@@ -925,7 +938,8 @@ class CScript(bytes, ScriptCoinClass, next_dispatch_final=True):
         """
         if checksize and len(self) > MAX_SCRIPT_ELEMENT_SIZE:
             raise ValueError("redeemScript exceeds max allowed size; P2SH output would be unspendable")
-        return self.__class__([0, hashlib.sha256(self).digest()])
+        return self.__class__(_P2WSH_SPK_PREFIX
+                              + hashlib.sha256(self).digest())
 
     def to_p2wpkh_scriptPubKey(self, checksize=True):
         """Create P2WPKH scriptPubKey from this redeemScript
@@ -941,7 +955,8 @@ class CScript(bytes, ScriptCoinClass, next_dispatch_final=True):
         """
         if checksize and len(self) > MAX_SCRIPT_ELEMENT_SIZE:
             raise ValueError("redeemScript exceeds max allowed size; P2WPKH output would be unspendable")
-        return self.__class__([0, bitcointx.core.Hash160(self)])
+        return self.__class__(_P2WPKH_SPK_PREFIX
+                              + bitcointx.core.Hash160(self))
 
     def GetSigOpCount(self, fAccurate):
         """Get the SigOp count.
@@ -1105,6 +1120,29 @@ def CompareBigEndian(c1, c2):
     return 0
 
 
+def _bip143_tx_hashes(txTo):
+    """Return (hashPrevouts, hashSequence, hashOutputs) for all inputs and
+    outputs of the transaction, as defined in BIP143. They do not depend on
+    the input being signed, so for immutable transactions they are computed
+    only once, and reused for each of the inputs"""
+    if txTo.is_immutable():
+        try:
+            return txTo._cached_bip143_tx_hashes
+        except AttributeError:
+            pass
+
+    tx_hashes = (
+        bitcointx.core.Hash(b''.join(i.prevout.serialize() for i in txTo.vin)),
+        bitcointx.core.Hash(b''.join(struct.pack("<I", i.nSequence) for i in txTo.vin)),
+        bitcointx.core.Hash(b''.join(o.serialize() for o in txTo.vout))
+    )
+
+    if txTo.is_immutable():
+        object.__setattr__(txTo, '_cached_bip143_tx_hashes', tx_hashes)
+
+    return tx_hashes
+
+
 def RawBitcoinSignatureHash(script, txTo, inIdx, hashtype, amount=0, sigversion=SIGVERSION_BASE):
     """Consensus-correct SignatureHash
 
@@ -1123,23 +1161,20 @@ def RawBitcoinSignatureHash(script, txTo, inIdx, hashtype, amount=0, sigversion=
         hashSequence = b'\x00'*32
         hashOutputs  = b'\x00'*32
 
-        if not (hashtype & SIGHASH_ANYONECANPAY):
-            serialize_prevouts = bytes()
-            for i in txTo.vin:
-                serialize_prevouts += i.prevout.serialize()
-            hashPrevouts = bitcointx.core.Hash(serialize_prevouts)
-
-        if (not (hashtype & SIGHASH_ANYONECANPAY) and (hashtype & 0x1f) != SIGHASH_SINGLE and (hashtype & 0x1f) != SIGHASH_NONE):
-            serialize_sequence = bytes()
-            for i in txTo.vin:
-                serialize_sequence += struct.pack("<I", i.nSequence)
-            hashSequence = bitcointx.core.Hash(serialize_sequence)
-
-        if ((hashtype & 0x1f) != SIGHASH_SINGLE and (hashtype & 0x1f) != SIGHASH_NONE):
-            serialize_outputs = bytes()
-            for o in txTo.vout:
-                serialize_outputs += o.serialize()
-            hashOutputs = bitcointx.core.Hash(serialize_outputs)
+        all_inputs = not (hashtype & SIGHASH_ANYONECANPAY)
+        all_outputs = ((hashtype & 0x1f) != SIGHASH_SINGLE and (hashtype & 0x1f) != SIGHASH_NONE)
+
+        if all_inputs or all_outputs:
+            tx_hashes = _bip143_tx_hashes(txTo)
+
+        if all_inputs:
+            hashPrevouts = tx_hashes[0]
+
+        if all_inputs and all_outputs:
+            hashSequence = tx_hashes[1]
+
+        if all_outputs:
+            hashOutputs = tx_hashes[2]
         elif ((hashtype & 0x1f) == SIGHASH_SINGLE and inIdx < len(txTo.vout)):
             serialize_outputs = txTo.vout[inIdx].serialize()
             hashOutputs = bitcointx.core.Hash(serialize_outputs)
@@ -55,6 +55,23 @@ SECP256K1_EC_UNCOMPRESSED = (SECP256K1_FLAGS_TYPE_COMPRESSION)
 
 _secp256k1_error_storage = threading.local()
 
+
+class _Secp256k1ScratchBuffers(threading.local):
+    """Per-thread output buffers for the calls into secp256k1 whose
+    results are copied out right away, so that these calls do not
+    need to allocate new buffers each time.
+    The buffers must not be returned or stored by the callers."""
+
+    def __init__(self):
+        self.raw_sig = ctypes.create_string_buffer(64)
+        self.raw_pubkey = ctypes.create_string_buffer(64)
+        self.der_sig = ctypes.create_string_buffer(SIGNATURE_SIZE)
+        self.der_sig_size = ctypes.c_size_t()
+        self.der_sig_size_ref = ctypes.byref(self.der_sig_size)
+
+
+_secp256k1_scratch = _Secp256k1ScratchBuffers()
+
 _ctypes_functype = getattr(ctypes, 'WINFUNCTYPE', getattr(ctypes, 'CFUNCTYPE'))
 
 
@@ -84,110 +101,212 @@ secp256k1_has_privkey_negate = False
 secp256k1_has_pubkey_negate = False
 secp256k1_has_ecdh = False
 
+_c_void_p = ctypes.c_void_p
+_c_char_p = ctypes.c_char_p
+_c_int = ctypes.c_int
+_c_uint = ctypes.c_uint
+_c_size_t = ctypes.c_size_t
+
+# (function name, restype, argtypes)
+_function_definitions = (
+    ('secp256k1_context_create', _c_void_p, [_c_uint]),
+    ('secp256k1_context_randomize', _c_int, [_c_void_p, _c_char_p]),
+    ('secp256k1_context_set_illegal_callback', None, [_c_void_p, _c_void_p, _c_void_p]),
+    ('secp256k1_context_set_error_callback', None, [_c_void_p, _c_void_p, _c_void_p]),
+    ('secp256k1_ecdsa_sign', _c_int, [_c_void_p, _c_char_p, _c_char_p, _c_char_p, _c_void_p, _c_void_p]),
+    ('secp256k1_ecdsa_signature_serialize_der', _c_int, [_c_void_p, _c_char_p, ctypes.POINTER(_c_size_t), _c_char_p]),
+    ('secp256k1_ec_pubkey_create', _c_int, [_c_void_p, _c_char_p, _c_char_p]),
+    ('secp256k1_ec_seckey_verify', _c_int, [_c_void_p, _c_char_p]),
+    ('secp256k1_ecdsa_signature_parse_der', _c_int, [_c_void_p, _c_char_p, _c_char_p, _c_size_t]),
+    ('secp256k1_ecdsa_signature_normalize', _c_int, [_c_void_p, _c_char_p, _c_char_p]),
+    ('secp256k1_ecdsa_verify', _c_int, [_c_void_p, _c_char_p, _c_char_p, _c_char_p]),
+    ('secp256k1_ec_pubkey_parse', _c_int, [_c_void_p, _c_char_p, _c_char_p, _c_size_t]),
+    ('secp256k1_ec_pubkey_tweak_add', _c_int, [_c_void_p, _c_char_p, _c_char_p]),
+    ('secp256k1_ec_privkey_tweak_add', _c_int, [_c_void_p, _c_char_p, _c_char_p]),
+    ('secp256k1_ec_pubkey_combine', _c_int, [_c_void_p, _c_char_p, ctypes.POINTER(_c_char_p), _c_int]),
+)
 
-def _add_function_definitions(_secp256k1):
-    global secp256k1_has_pubkey_recovery
-    global secp256k1_has_privkey_negate
-    global secp256k1_has_pubkey_negate
-    global secp256k1_has_ecdh
-
-    if getattr(_secp256k1, 'secp256k1_ecdsa_sign_recoverable', None):
-        secp256k1_has_pubkey_recovery = True
-        _secp256k1.secp256k1_ecdsa_sign_recoverable.restype = ctypes.c_int
-        _secp256k1.secp256k1_ecdsa_sign_recoverable.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_void_p, ctypes.c_void_p]
-
-        _secp256k1.secp256k1_ecdsa_recoverable_signature_serialize_compact.restype = ctypes.c_int
-        _secp256k1.secp256k1_ecdsa_recoverable_signature_serialize_compact.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.POINTER(ctypes.c_int), ctypes.c_char_p]
+# Functions that may be absent, depending on the modules libsecp256k1
+# was compiled with. (name of the flag that is set to True if the first
+# function is present, function definitions)
+_optional_function_definitions = (
+    ('secp256k1_has_pubkey_recovery', (
+        ('secp256k1_ecdsa_sign_recoverable', _c_int, [_c_void_p, _c_char_p, _c_char_p, _c_char_p, _c_void_p, _c_void_p]),
+        ('secp256k1_ecdsa_recoverable_signature_serialize_compact', _c_int, [_c_void_p, _c_char_p, ctypes.POINTER(_c_int), _c_char_p]),
+        ('secp256k1_ecdsa_recover', _c_int, [_c_void_p, _c_char_p, _c_char_p, _c_char_p]),
+        ('secp256k1_ecdsa_recoverable_signature_parse_compact', _c_int, [_c_void_p, _c_char_p, _c_char_p, _c_int]),
+    )),
+    ('secp256k1_has_pubkey_negate', (
+        ('secp256k1_ec_pubkey_negate', _c_int, [_c_void_p, _c_char_p]),
+    )),
+    ('secp256k1_has_privkey_negate', (
+        ('secp256k1_ec_privkey_negate', _c_int, [_c_void_p, _c_char_p]),
+    )),
+    ('secp256k1_has_ecdh', (
+        ('secp256k1_ecdh', _c_int, [_c_void_p, _c_char_p, _c_char_p, _c_void_p, _c_void_p]),
+    )),
+)
 
-        _secp256k1.secp256k1_ecdsa_recover.restype = ctypes.c_int
-        _secp256k1.secp256k1_ecdsa_recover.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p]
 
-        _secp256k1.secp256k1_ecdsa_recoverable_signature_parse_compact.restype = ctypes.c_int
-        _secp256k1.secp256k1_ecdsa_recoverable_signature_parse_compact.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_int]
+def _add_function_definitions(_secp256k1):
+    module_globals = globals()
+    for flag_name, definitions in _optional_function_definitions:
+        if getattr(_secp256k1, definitions[0][0], None):
+            module_globals[flag_name] = True
+            for name, restype, argtypes in definitions:
+                func = getattr(_secp256k1, name)
+                func.restype = restype
+                func.argtypes = argtypes
+
+    for name, restype, argtypes in _function_definitions:
+        func = getattr(_secp256k1, name)
+        func.restype = restype
+        func.argtypes = argtypes
 
-    _secp256k1.secp256k1_context_create.restype = ctypes.c_void_p
     _secp256k1.secp256k1_context_create.errcheck = _check_ressecp256k1_void_p
-    _secp256k1.secp256k1_context_create.argtypes = [ctypes.c_uint]
-
-    _secp256k1.secp256k1_context_randomize.restype = ctypes.c_int
-    _secp256k1.secp256k1_context_randomize.argtypes = [ctypes.c_void_p, ctypes.c_char_p]
-
-    _secp256k1.secp256k1_context_set_illegal_callback.restype = None
-    _secp256k1.secp256k1_context_set_illegal_callback.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p]
-
-    _secp256k1.secp256k1_context_set_error_callback.restype = None
-    _secp256k1.secp256k1_context_set_error_callback.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p]
-
-    _secp256k1.secp256k1_ecdsa_sign.restype = ctypes.c_int
-    _secp256k1.secp256k1_ecdsa_sign.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_void_p, ctypes.c_void_p]
-
-    _secp256k1.secp256k1_ecdsa_signature_serialize_der.restype = ctypes.c_int
-    _secp256k1.secp256k1_ecdsa_signature_serialize_der.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.POINTER(ctypes.c_size_t), ctypes.c_char_p]
-
-    _secp256k1.secp256k1_ec_pubkey_create.restype = ctypes.c_int
-    _secp256k1.secp256k1_ec_pubkey_create.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p]
-
-    _secp256k1.secp256k1_ec_seckey_verify.restype = ctypes.c_int
-    _secp256k1.secp256k1_ec_seckey_verify.argtypes = [ctypes.c_void_p, ctypes.c_char_p]
-
-    _secp256k1.secp256k1_ecdsa_signature_parse_der.restype = ctypes.c_int
-    _secp256k1.secp256k1_ecdsa_signature_parse_der.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_size_t]
 
-    _secp256k1.secp256k1_ecdsa_signature_normalize.restype = ctypes.c_int
-    _secp256k1.secp256k1_ecdsa_signature_normalize.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p]
 
-    _secp256k1.secp256k1_ecdsa_verify.restype = ctypes.c_int
-    _secp256k1.secp256k1_ecdsa_verify.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p]
+_VALID_CTX_FLAGS = SECP256K1_CONTEXT_SIGN | SECP256K1_CONTEXT_VERIFY
 
-    _secp256k1.secp256k1_ec_pubkey_parse.restype = ctypes.c_int
-    _secp256k1.secp256k1_ec_pubkey_parse.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_size_t]
-
-    _secp256k1.secp256k1_ec_pubkey_tweak_add.restype = ctypes.c_int
-    _secp256k1.secp256k1_ec_pubkey_tweak_add.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p]
-
-    _secp256k1.secp256k1_ec_privkey_tweak_add.restype = ctypes.c_int
-    _secp256k1.secp256k1_ec_privkey_tweak_add.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p]
-
-    if getattr(_secp256k1, 'secp256k1_ec_pubkey_negate', None):
-        secp256k1_has_pubkey_negate = True
-        _secp256k1.secp256k1_ec_pubkey_negate.restype = ctypes.c_int
-        _secp256k1.secp256k1_ec_pubkey_negate.argtypes = [ctypes.c_void_p, ctypes.c_char_p]
-
-    if getattr(_secp256k1, 'secp256k1_ec_privkey_negate', None):
-        secp256k1_has_privkey_negate = True
-        _secp256k1.secp256k1_ec_privkey_negate.restype = ctypes.c_int
-        _secp256k1.secp256k1_ec_privkey_negate.argtypes = [ctypes.c_void_p, ctypes.c_char_p]
-
-    _secp256k1.secp256k1_ec_pubkey_combine.restype = ctypes.c_int
-    _secp256k1.secp256k1_ec_pubkey_combine.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.POINTER(ctypes.c_char_p), ctypes.c_int]
-
-    if getattr(_secp256k1, 'secp256k1_ecdh', None):
-        secp256k1_has_ecdh = True
-        _secp256k1.secp256k1_ecdh.restype = ctypes.c_int
-        _secp256k1.secp256k1_ecdh.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_void_p, ctypes.c_void_p]
+_ZERO_RANDOMIZATION_SEED = b'\x00' * 32
 
 
 def secp256k1_create_and_init_context(_secp256k1, flags):
-    assert (flags & ~(SECP256K1_CONTEXT_SIGN | SECP256K1_CONTEXT_VERIFY)) == 0
+    if flags & ~_VALID_CTX_FLAGS:
+        raise ValueError('invalid flags for secp256k1 context: {}'
+                         .format(flags))
 
     ctx = _secp256k1.secp256k1_context_create(flags)
-    assert ctx is not None
+    if ctx is None:
+        raise Libsecp256k1Exception('secp256k1_context_create() failed')
 
     _secp256k1.secp256k1_context_set_error_callback(ctx, _secp256k1_error_callback_fn, 0)
     _secp256k1.secp256k1_context_set_illegal_callback(ctx, _secp256k1_illegal_callback_fn, 0)
 
-    seed = os.urandom(32)
     # secp256k1 commit 6198375218b8132f016b701ef049fb295ca28c95 comment
     # says that "non-signing contexts may use randomization in the future"
     # so we always call randomize, but check for success only for
     # signing context, because older lib versions return 0 for non-signing ctx.
+    # Randomization is a side-channel protection for operations that
+    # involve secret data, and verification does not involve any,
+    # so the seed is only taken from os.urandom() for signing context.
+    if (flags & SECP256K1_CONTEXT_SIGN) == SECP256K1_CONTEXT_SIGN:
+        seed = os.urandom(32)
+    else:
+        seed = _ZERO_RANDOMIZATION_SEED
     res = _secp256k1.secp256k1_context_randomize(ctx, seed)
     if (flags & SECP256K1_CONTEXT_SIGN) == SECP256K1_CONTEXT_SIGN:
-        assert res == 1, "randomization must succeed for signing context"
+        if res != 1:
+            raise Libsecp256k1Exception(
+                'randomization must succeed for signing context')
 
     return ctx
 
 
+def build_aligned_data_array(data_list, expected_len):
+    """Build a ctypes array of bytes out of the elements of data_list,
+    each of which must be exactly expected_len bytes long.
+    Element i of data_list starts at offset i*expected_len in the array."""
+    data_list = list(data_list)
+    for data in data_list:
+        if len(data) != expected_len:
+            raise ValueError(
+                'all elements must be {} bytes long, got element '
+                'with length {}'.format(expected_len, len(data)))
+    return (ctypes.c_char * (expected_len * len(data_list))).from_buffer_copy(
+        b''.join(data_list))
+
+
+def secp256k1_ecdsa_verify_many(ctx, sigs, msgs, pubs):
+    """Verify a number of signatures in one call.
+
+    sigs is a sequence of 64-byte parsed signatures (secp256k1_ecdsa_signature),
+    msgs is a sequence of 32-byte message hashes, and pubs is a sequence of
+    64-byte parsed public keys (secp256k1_pubkey). Signatures must be already
+    normalized, if lower-S form is required. All three sequences must be
+    of the same length.
+
+    The elements are packed into contiguous arrays once, and the
+    verification is done for each set of elements in turn. If libsecp256k1
+    gains a batch verification function, it can be used here without
+    changes to the callers.
+
+    Returns a list of bools, one for each signature, in the same order.
+    """
+    if not (len(sigs) == len(msgs) == len(pubs)):
+        raise ValueError('sigs, msgs and pubs must be of the same length')
+
+    sigs_array = build_aligned_data_array(sigs, 64)
+    msgs_array = build_aligned_data_array(msgs, 32)
+    pubs_array = build_aligned_data_array(pubs, 64)
+
+    sigs_addr = ctypes.addressof(sigs_array)
+    msgs_addr = ctypes.addressof(msgs_array)
+    pubs_addr = ctypes.addressof(pubs_array)
+
+    verify_fn = _secp256k1.secp256k1_ecdsa_verify
+    c_char_p = ctypes.c_char_p
+    return [verify_fn(ctx,
+                      c_char_p(sigs_addr + i*64),
+                      c_char_p(msgs_addr + i*32),
+                      c_char_p(pubs_addr + i*64)) == 1
+            for i in range(len(sigs))]
+
+
+_verify_batch_executor = None
+_verify_batch_executor_lock = threading.Lock()
+_verify_batch_max_workers = os.cpu_count() or 1
+
+
+def _get_verify_batch_executor():
+    global _verify_batch_executor
+    with _verify_batch_executor_lock:
+        if _verify_batch_executor is None:
+            # concurrent.futures is imported only when it is needed,
+            # because importing it pulls in logging and takes
+            # a noticeable part of the import time of this module
+            import concurrent.futures
+            _verify_batch_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=_verify_batch_max_workers)
+        return _verify_batch_executor
+
+
+def _verify_batch_chunk(sigs_msgs_pubs):
+    verify_fn = _secp256k1.secp256k1_ecdsa_verify
+    ctx = secp256k1_context_verify
+    return [verify_fn(ctx, raw_sig, msg, raw_pub) == 1
+            for raw_sig, msg, raw_pub in sigs_msgs_pubs]
+
+
+def secp256k1_ecdsa_verify_batch(sigs_msgs_pubs):
+    """Verify a number of signatures, running the verification
+    in a pool of threads. ctypes releases the GIL for the duration
+    of the call into the library, so the verifications can run in
+    parallel on multiple cores.
+
+    sigs_msgs_pubs is an iterable of (raw_sig, msg, raw_pub) tuples,
+    where raw_sig is a 64-byte parsed signature (secp256k1_ecdsa_signature),
+    msg is a 32-byte message hash, and raw_pub is a 64-byte parsed
+    public key (secp256k1_pubkey). Signatures must be already normalized,
+    if lower-S form is required.
+
+    Returns a list of bools, one for each tuple, in the same order.
+    """
+    items = list(sigs_msgs_pubs)
+    n_chunks = min(len(items), _verify_batch_max_workers)
+    if n_chunks <= 1:
+        return _verify_batch_chunk(items)
+
+    chunk_size = -(-len(items) // n_chunks)
+    chunks = [items[i:i+chunk_size] for i in range(0, len(items), chunk_size)]
+
+    results = []
+    for chunk_result in _get_verify_batch_executor().map(_verify_batch_chunk,
+                                                         chunks):
+        results.extend(chunk_result)
+    return results
+
+
 def load_secp256k1_library():
     """load libsecp256k1 via ctypes, add default function definitions
     to the library handle, and return this handle.
@@ -219,8 +338,18 @@ def load_secp256k1_library():
 # Anyone that uses it directly should know that they are doing.
 _secp256k1 = load_secp256k1_library()
 
-secp256k1_context_sign = secp256k1_create_and_init_context(_secp256k1, SECP256K1_CONTEXT_SIGN)
-secp256k1_context_verify = secp256k1_create_and_init_context(_secp256k1, SECP256K1_CONTEXT_VERIFY)
+# With older versions of libsecp256k1, each context holds its own copy
+# of precomputed tables. If BITCOINTX_SHARED_CTX environment variable
+# is set to a non-empty value other than '0', one context with both
+# sign and verify flags is created and used for signing and verification,
+# to save memory. Otherwise, separate contexts are used.
+if os.environ.get('BITCOINTX_SHARED_CTX', '0') not in ('', '0'):
+    secp256k1_context_sign = secp256k1_create_and_init_context(
+        _secp256k1, SECP256K1_CONTEXT_SIGN | SECP256K1_CONTEXT_VERIFY)
+    secp256k1_context_verify = secp256k1_context_sign
+else:
+    secp256k1_context_sign = secp256k1_create_and_init_context(_secp256k1, SECP256K1_CONTEXT_SIGN)
+    secp256k1_context_verify = secp256k1_create_and_init_context(_secp256k1, SECP256K1_CONTEXT_VERIFY)
 
 
 __all__ = (
@@ -236,4 +365,7 @@ __all__ = (
     'SECP256K1_CONTEXT_SIGN',
     'SECP256K1_CONTEXT_VERIFY',
     'secp256k1_has_pubkey_recovery',
+    'secp256k1_ecdsa_verify_batch',
+    'secp256k1_ecdsa_verify_many',
+    'build_aligned_data_array',
 )
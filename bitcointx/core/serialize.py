@@ -30,9 +30,22 @@ def Hash(msg):
     return hashlib.sha256(hashlib.sha256(msg).digest()).digest()
 
 
+# Copying an existing hash object is faster than looking up
+# the algorithm by name with hashlib.new() on each call.
+# Some OpenSSL builds do not provide ripemd160, in that case
+# Hash160() will raise the error when called, not on import.
+try:
+    _ripemd160_initial = hashlib.new('ripemd160')
+except ValueError:
+    _ripemd160_initial = None
+
+
 def Hash160(msg):
     """RIPEME160(SHA256(msg)) -> bytes"""
-    h = hashlib.new('ripemd160')
+    if _ripemd160_initial is None:
+        h = hashlib.new('ripemd160')
+    else:
+        h = _ripemd160_initial.copy()
     h.update(hashlib.sha256(msg).digest())
     return h.digest()
 
@@ -134,7 +147,7 @@ class Serializable(object):
 class ImmutableSerializable(Serializable):
     """Immutable serializable object"""
 
-    __slots__ = ['_cached_GetHash', '_cached__hash__']
+    __slots__ = ['_cached_GetHash', '_cached__hash__', '_cached_serialize']
 
     def __setattr__(self, name, value):
         raise AttributeError('Object is immutable')
@@ -142,6 +155,20 @@ class ImmutableSerializable(Serializable):
     def __delattr__(self, name):
         raise AttributeError('Object is immutable')
 
+    def serialize(self, **kwargs):
+        """Serialize, returning bytes
+
+        The result of serialization with default arguments
+        is cached, because the object cannot change"""
+        if kwargs:
+            return super().serialize(**kwargs)
+        try:
+            return self._cached_serialize
+        except AttributeError:
+            _cached_serialize = super().serialize()
+            object.__setattr__(self, '_cached_serialize', _cached_serialize)
+            return _cached_serialize
+
     def GetHash(self):
         """Return the hash of the serialized object"""
         try:
@@ -334,12 +361,13 @@ def make_mutable(cls):
         ("make_mutable can only be applied to subclasses "
             "of ImmutableSerializable")
     # For speed we use a class decorator that removes the immutable
-    # restrictions directly. In addition the modified behavior of GetHash() and
-    # hash() is undone.
+    # restrictions directly. In addition the modified behavior of GetHash(),
+    # hash() and serialize() is undone.
     cls.__setattr__ = object.__setattr__
     cls.__delattr__ = object.__delattr__
     cls.GetHash = Serializable.GetHash
     cls.__hash__ = Serializable.__hash__
+    cls.serialize = Serializable.serialize
     return cls
 
 
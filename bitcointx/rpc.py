@@ -27,8 +27,12 @@ thus better optimized but perhaps less stable.)
 import http.client
 import base64
 import decimal
+import functools
+import itertools
 import json
 import os
+import re
+import threading
 import urllib.parse
 
 import bitcointx
@@ -102,6 +106,11 @@ class InWarmupError(JSONRPCError):
     RPC_ERROR_CODE = -28
 
 
+# Matches 'key=value' lines of the config file. Everything after '#'
+# is a comment, and value can contain '=', but key cannot
+_CONF_LINE_RE = re.compile(r'^([^#=\n]*)=([^#\n]*)', re.MULTILINE)
+
+
 def _try_read_conf_file(conf_file, allow_default_conf):
     # Bitcoin Core accepts empty rpcuser,
     # not specified in conf_file
@@ -110,12 +119,7 @@ def _try_read_conf_file(conf_file, allow_default_conf):
     # Extract contents of bitcoin.conf to build service_url
     try:
         with open(conf_file, 'r') as fd:
-            for line in fd.readlines():
-                if '#' in line:
-                    line = line[:line.index('#')]
-                if '=' not in line:
-                    continue
-                k, v = line.split('=', 1)
+            for k, v in _CONF_LINE_RE.findall(fd.read()):
                 conf[k.strip()] = v.strip()
 
     # Treat a missing bitcoin.conf as though it were empty
@@ -127,6 +131,26 @@ def _try_read_conf_file(conf_file, allow_default_conf):
     return conf
 
 
+@functools.lru_cache(maxsize=1024)
+def _make_call_prefix(service_name):
+    """Return the start of the JSON-encoded request to call service_name,
+    up to the value of 'params'"""
+    return '{"version": "1.1", "method": %s, "params": ' % (
+        json.dumps(service_name), )
+
+
+def _encode_batch(rpc_call_list):
+    # Encode the calls one by one into the buffer, rather than
+    # building the list of all calls first and then encoding it
+    buf = bytearray(b'[')
+    for rpc_call in rpc_call_list:
+        if len(buf) > 1:
+            buf += b','
+        buf += json.dumps(rpc_call).encode('utf8')
+    buf += b']'
+    return buf
+
+
 def split_hostport(hostport):
     r = hostport.rsplit(':', maxsplit=1)
     if len(r) == 1:
@@ -155,16 +179,30 @@ class RPCCaller:
                  conf_file=None,
                  allow_default_conf=False,
                  timeout=DEFAULT_HTTP_TIMEOUT,
-                 connection=None):
+                 connection=None,
+                 decode_decimal=True):
 
         # Create a dummy connection early on so if __init__() fails prior to
         # __conn being created __del__() can detect the condition and handle it
         # correctly.
         self.__conn = None
+        self.__conn_lock = threading.Lock()
+        self.__extra_conns = []
+        self.__can_add_conns = False
         authpair = None
 
         self.__timeout = timeout
 
+        # Floats in responses are decoded as Decimal by default, so that
+        # amounts are not rounded. With decode_decimal=False, they are
+        # decoded as float, which is faster for the responses with
+        # many numbers, because json then does not have to call
+        # back into python code for each of them.
+        if decode_decimal:
+            self.__json_parse_float = decimal.Decimal
+        else:
+            self.__json_parse_float = None
+
         if service_url is None:
             params = bitcointx.get_current_chain_params()
 
@@ -189,10 +227,10 @@ class RPCCaller:
             port = int(conf.get('{}.rpcport'.format(extraname),
                                 conf.get('rpcport', port or service_port)))
             service_url = ('%s://%s:%d' % ('http', host, port))
+            url = urllib.parse.urlparse(service_url)
 
             cookie_dir = conf.get('datadir', os.path.dirname(conf_file))
-            cookie_dir = os.path.join(cookie_dir,
-                                      params.get_datadir_extra_name())
+            cookie_dir = os.path.join(cookie_dir, extraname)
             cookie_file = os.path.join(cookie_dir, ".cookie")
             try:
                 with open(cookie_file, 'r') as fd:
@@ -212,17 +250,23 @@ class RPCCaller:
             authpair = "%s:%s" % (url.username, url.password)
 
         self.__service_url = service_url
-        self.__url = urllib.parse.urlparse(service_url)
+        self.__url = url
+        # http.client would send '/' for the empty path anyway
+        self.__path = url.path or '/'
 
-        if self.__url.scheme not in ('http',):
+        if self.__url.scheme not in ('http', 'https'):
             raise ValueError('Unsupported URL scheme %r' % self.__url.scheme)
 
         if self.__url.port is None:
-            self.__port = service_port or http.client.HTTP_PORT
+            if self.__url.scheme == 'https':
+                default_port = http.client.HTTPS_PORT
+            else:
+                default_port = http.client.HTTP_PORT
+            self.__port = service_port or default_port
         else:
             self.__port = self.__url.port
 
-        self.__id_count = 0
+        self.__id_counter = itertools.count(1)
 
         if authpair is None:
             self.__auth_header = None
@@ -230,35 +274,52 @@ class RPCCaller:
             authpair = authpair.encode('utf8')
             self.__auth_header = b"Basic " + base64.b64encode(authpair)
 
+        # http.client does not modify the headers passed to request(),
+        # so the same dict can be used for every call. The values are
+        # encoded here, because http.client would encode str values
+        # on each request.
+        self.__headers = {
+            'Host': self.__url.hostname.encode('idna'),
+            'User-Agent': DEFAULT_USER_AGENT.encode('ascii'),
+            'Content-type': b'application/json',
+            'Connection': b'keep-alive',
+        }
+
+        if self.__auth_header is not None:
+            self.__headers['Authorization'] = self.__auth_header
+
         self.connect(connection=connection)
 
     def connect(self, connection=None):
+        """Set the connection to use for calls. If the connection is
+        not supplied, a new connection is created, and when calls are made
+        concurrently from several threads, additional connections are
+        created for them as needed. A supplied connection is used for all
+        calls, and concurrent calls wait for each other."""
         if connection:
             self.__conn = connection
+            self.__can_add_conns = False
         else:
-            self.__conn = http.client.HTTPConnection(
+            self.__conn = self._new_connection()
+            self.__can_add_conns = True
+
+    def _new_connection(self):
+        if self.__url.scheme == 'https':
+            return http.client.HTTPSConnection(
                 self.__url.hostname, port=self.__port, timeout=self.__timeout)
+        return http.client.HTTPConnection(
+            self.__url.hostname, port=self.__port, timeout=self.__timeout)
 
     def _call(self, service_name, *args):
-        self.__id_count += 1
-
-        postdata = json.dumps({'version': '1.1',
-                               'method': service_name,
-                               'params': args,
-                               'id': self.__id_count})
+        return self._call_prepared(_make_call_prefix(service_name), *args)
 
-        headers = {
-            'Host': self.__url.hostname,
-            'User-Agent': DEFAULT_USER_AGENT,
-            'Content-type': 'application/json',
-        }
-
-        if self.__auth_header is not None:
-            headers['Authorization'] = self.__auth_header
-
-        self.__conn.request('POST', self.__url.path, postdata, headers)
+    def _call_prepared(self, call_prefix, *args):
+        # Only params and id differ between the calls of the same method,
+        # the rest of the request is in call_prefix
+        postdata = '%s%s, "id": %d}' % (call_prefix, json.dumps(args),
+                                        next(self.__id_counter))
 
-        response = self._get_response()
+        response = self._send_request(postdata)
         err = response.get('error')
         if err is not None:
             if isinstance(err, dict):
@@ -273,31 +334,75 @@ class RPCCaller:
         else:
             return response['result']
 
-    def _batch(self, rpc_call_list):
-        postdata = json.dumps(list(rpc_call_list))
-
-        headers = {
-            'Host': self.__url.hostname,
-            'User-Agent': DEFAULT_USER_AGENT,
-            'Content-type': 'application/json',
-        }
+    def _batch(self, rpc_call_list, max_batch_size=None):
+        """Send a batch of calls and return the list of responses.
+        rpc_call_list can be any iterable of call dicts.
+        If max_batch_size is specified, the calls are sent in
+        several requests of no more than max_batch_size calls each,
+        and the responses to these requests are joined into one list"""
+        if max_batch_size is None:
+            return self._send_request(_encode_batch(rpc_call_list))
+
+        if max_batch_size < 1:
+            raise ValueError('max_batch_size must be positive')
+
+        calls_iter = iter(rpc_call_list)
+        responses = []
+        while True:
+            calls = list(itertools.islice(calls_iter, max_batch_size))
+            if not calls:
+                return responses
+            responses.extend(self._send_request(_encode_batch(calls)))
+
+    def _send_request(self, postdata):
+        # If the main connection is busy with a call from another thread,
+        # use one of the additional connections, or create a new one
+        if self.__conn_lock.acquire(blocking=not self.__can_add_conns):
+            try:
+                return self._send_request_on(self.__conn, postdata)
+            finally:
+                self.__conn_lock.release()
 
-        if self.__auth_header is not None:
-            headers['Authorization'] = self.__auth_header
+        try:
+            conn = self.__extra_conns.pop()
+        except IndexError:
+            conn = self._new_connection()
 
-        self.__conn.request('POST', self.__url.path, postdata, headers)
-        return self._get_response()
+        try:
+            return self._send_request_on(conn, postdata)
+        finally:
+            self.__extra_conns.append(conn)
 
-    def _get_response(self):
-        http_response = self.__conn.getresponse()
+    def _send_request_on(self, conn, postdata):
+        try:
+            conn.request('POST', self.__path, postdata, self.__headers)
+        except (ConnectionResetError, BrokenPipeError):
+            # The server may close the kept-alive connection while it is
+            # idle, and this is only detected on the next request.
+            # Closing the connection makes http.client open a new one
+            # on the next request, try once more with a fresh connection.
+            # Only the failure to send the request is retried: if the
+            # connection fails while waiting for the response, the server
+            # might have already executed the call, and calls like
+            # sendtoaddress must not be executed twice.
+            conn.close()
+            conn.request('POST', self.__path, postdata, self.__headers)
+
+        return self._get_response(conn)
+
+    def _get_response(self, conn):
+        http_response = conn.getresponse()
         if http_response is None:
             raise JSONRPCError({
                 'code': -342, 'message': 'missing HTTP response from server'})
 
-        rdata = http_response.read().decode('utf8')
+        # json.loads() accepts utf8-encoded bytes directly, the response
+        # only needs to be decoded here to show it in the error message
+        rdata = http_response.read()
         try:
-            return json.loads(rdata, parse_float=decimal.Decimal)
+            return json.loads(rdata, parse_float=self.__json_parse_float)
         except Exception:
+            rdata = rdata.decode('utf8', errors='replace')
             raise JSONRPCError({
                 'code': -342,
                 'message': ('non-JSON HTTP response with \'%i %s\' '
@@ -308,10 +413,11 @@ class RPCCaller:
     def close(self):
         if self.__conn is not None:
             self.__conn.close()
+        for conn in self.__extra_conns:
+            conn.close()
 
     def __del__(self):
-        if self.__conn is not None:
-            self.__conn.close()
+        self.close()
 
     def __getattr__(self, name):
         if name.startswith('__') and name.endswith('__'):
@@ -321,12 +427,21 @@ class RPCCaller:
             # attribute, we do not want the bogus RPC call to happen.
             raise AttributeError
 
-        # Create a callable to do the actual call
-        def f(*args): return self._call(name, *args)
+        # Create a callable to do the actual call. If a subclass
+        # has its own _call(), it needs to be used for the call.
+        if type(self)._call is RPCCaller._call:
+            f = functools.partial(self._call_prepared,
+                                  _make_call_prefix(name))
+        else:
+            f = functools.partial(self._call, name)
 
-        # Make debuggers show <function bitcointx.rpc.name>
-        # rather than <function bitcointx.rpc.<lambda>>
+        # Make debuggers show the name of the RPC method
         f.__name__ = name
+
+        # The callable is not stored on the instance: it refers to
+        # the instance, and storing it would create a reference cycle,
+        # delaying the closing of the connection when the instance
+        # is dropped. The call prefix for the name is cached instead.
         return f
 
 
@@ -31,15 +31,26 @@ if sys.version > '3':
 CHARSET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
 
 
+_GENERATOR = [0x3b6a57b2, 0x26508e6d, 0x1ea119fa, 0x3d4233dd, 0x2a1462b3]
+
+# XOR of the generator terms selected by each possible value of the top
+# 5 bits of the checksum, so that bech32_polymod() needs one lookup per
+# value instead of testing each of the bits separately
+_GENERATOR_TABLE = []
+for _top in range(32):
+    _chk = 0
+    for _i in range(5):
+        if (_top >> _i) & 1:
+            _chk ^= _GENERATOR[_i]
+    _GENERATOR_TABLE.append(_chk)
+del _top, _chk, _i
+
+
 def bech32_polymod(values):
     """Internal function that computes the Bech32 checksum."""
-    generator = [0x3b6a57b2, 0x26508e6d, 0x1ea119fa, 0x3d4233dd, 0x2a1462b3]
     chk = 1
     for value in values:
-        top = chk >> 25
-        chk = (chk & 0x1ffffff) << 5 ^ value
-        for i in range(5):
-            chk ^= generator[i] if ((top >> i) & 1) else 0
+        chk = ((chk & 0x1ffffff) << 5 ^ value) ^ _GENERATOR_TABLE[chk >> 25]
     return chk
 
 
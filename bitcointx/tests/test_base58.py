@@ -17,7 +17,9 @@ import unittest
 
 from binascii import unhexlify
 
-from bitcointx.base58 import CBase58Data, encode, decode, Base58Error
+from bitcointx.base58 import (
+    CBase58Data, encode, decode, Base58Error, InvalidBase58Error
+)
 
 
 def load_test_vectors(name):
@@ -37,6 +39,33 @@ class Test_base58(unittest.TestCase):
             self.assertEqual(act_base58, exp_base58)
             self.assertEqual(act_bin, exp_bin)
 
+    def test_encode_buffers(self):
+        for data in (b'', b'\x00', b'\x00\x00\x01', b'\x00' * 20 + b'\xff'):
+            expected = encode(data)
+            self.assertEqual(encode(bytearray(data)), expected)
+            self.assertEqual(encode(memoryview(data)), expected)
+            self.assertEqual(decode(expected), data)
+
+        for invalid in (5, [0, 1], '01'):
+            with self.assertRaises(TypeError):
+                encode(invalid)
+
+    def test_decode_odd_and_even_length(self):
+        # decode() converts digits in pairs, strings of both odd and even
+        # length must be handled
+        for i in range(1, 40):
+            data = b'\x00' * (i % 3) + bytes(range(255, 255 - i, -1))
+            encoded = encode(data)
+            self.assertEqual(decode(encoded), data)
+        self.assertEqual(decode('2'), b'\x01')
+        self.assertEqual(decode('21'), b'\x3a')
+
+    def test_invalid_characters(self):
+        for invalid in ('0', 'O', 'I', 'l', '1A1zP1eP5QGefi2DMPTf+L5SLmv7DivfNa',
+                        '\u00e9', '1A1zP1eP5QGefi2DMPTf\u0406L5SLmv7DivfNa'):
+            with self.assertRaises(InvalidBase58Error):
+                decode(invalid)
+
 
 class Test_CBase58Data(unittest.TestCase):
 
@@ -56,6 +85,16 @@ class Test_CBase58Data(unittest.TestCase):
             ma = MockBase58Address(address)
             self.assertEqual(str(ma), address)
             self.assertEqual(bytes(ma), data)
+            # cached string representation is returned on subsequent calls
+            self.assertIs(str(ma), str(ma))
+
+            # but not when the prefix of the class was changed
+            other_prefix = bytes([(nVersion + 1) % 256])
+            MockBase58Address.base58_prefix = other_prefix
+            self.assertEqual(str(ma),
+                             str(CBase58Data.from_bytes(other_prefix + data)))
+            MockBase58Address.base58_prefix = prefix
+            self.assertEqual(str(ma), address)
 
             MockBase58Address.base58_prefix = bytes([(nVersion + 1) & 0xFF])
             with self.assertRaises(Base58Error):
@@ -19,7 +19,7 @@ from binascii import unhexlify
 
 from bitcointx.core.script import CScript, OP_0, OP_1, OP_16
 from bitcointx.bech32 import CBech32Data, Bech32Error
-from bitcointx.segwit_addr import encode, decode
+from bitcointx.segwit_addr import encode, decode, bech32_polymod
 
 
 def load_test_vectors(name):
@@ -55,6 +55,21 @@ class Test_bech32(unittest.TestCase):
             self.assertEqual(act_bech32.lower(), exp_bech32.lower())
             self.assertEqual(to_scriptPubKey(*act_bin), bytes(exp_bin))
 
+    def test_polymod(self):
+        def reference_polymod(values):
+            generator = [0x3b6a57b2, 0x26508e6d, 0x1ea119fa, 0x3d4233dd, 0x2a1462b3]
+            chk = 1
+            for value in values:
+                top = chk >> 25
+                chk = (chk & 0x1ffffff) << 5 ^ value
+                for i in range(5):
+                    chk ^= generator[i] if ((top >> i) & 1) else 0
+            return chk
+
+        for values in ([], [0], [31] * 90, list(range(32)) * 3,
+                       [(n * 7 + 3) % 32 for n in range(100)]):
+            self.assertEqual(bech32_polymod(values), reference_polymod(values))
+
 
 class MockBech32Data(CBech32Data):
     bech32_hrp = 'bc'
@@ -14,10 +14,14 @@
 
 import unittest
 
-from bitcointx import BitcoinMainnetParams, ChainParams
+from bitcointx import (
+    BitcoinMainnetParams, BitcoinTestnetParams, ChainParams,
+    get_current_chain_params, select_chain_params
+)
 from bitcointx.core import (
     str_money_value, MoneyRange, coins_to_satoshi, satoshi_to_coins,
     CoreBitcoinParams, CoreBitcoinClassDispatcher, CoreBitcoinClass,
+    CoreCoinClass, CTransaction
 )
 from bitcointx.wallet import WalletBitcoinClassDispatcher
 from bitcointx.util import classgetter
@@ -90,3 +94,76 @@ class Test_Money(unittest.TestCase):
                 coins_to_satoshi(max_satoshi+1)
             with self.assertRaises(ValueError):
                 satoshi_to_coins(max_satoshi+1)
+
+
+class Test_ClassDispatcher(unittest.TestCase):
+    def test_abc(self):
+        class VirtualTransaction:
+            ...
+
+        self.assertFalse(isinstance(VirtualTransaction(), CoreCoinClass))
+        CoreCoinClass.register(VirtualTransaction)
+        self.assertTrue(isinstance(VirtualTransaction(), CoreCoinClass))
+        self.assertTrue(issubclass(VirtualTransaction, CoreCoinClass))
+
+        self.assertTrue(isinstance(CTransaction(), CoreCoinClass))
+        self.assertTrue(issubclass(CTransaction, CoreCoinClass))
+        self.assertFalse(isinstance(1, CoreCoinClass))
+        self.assertFalse(issubclass(int, CoreCoinClass))
+
+
+class Test_ChainParams(unittest.TestCase):
+    def test_instances_are_shared(self):
+        self.assertIs(BitcoinMainnetParams(), BitcoinMainnetParams())
+        self.assertIsNot(BitcoinMainnetParams(), BitcoinTestnetParams())
+
+        with ChainParams('bitcoin/testnet'):
+            params = get_current_chain_params()
+            self.assertIs(params, BitcoinTestnetParams())
+            with ChainParams(BitcoinTestnetParams):
+                self.assertIs(get_current_chain_params(), params)
+
+    def test_positional_args(self):
+        class CustomParams(BitcoinMainnetParams):
+            def __init__(self, custom_value, other=None):
+                self.custom_value = custom_value
+                self.other = other
+
+        params = CustomParams(1, other=2)
+        self.assertEqual((params.custom_value, params.other), (1, 2))
+        # instances created with positional arguments are not shared
+        self.assertIsNot(CustomParams(1), CustomParams(1))
+        self.assertIs(CustomParams(custom_value=1),
+                      CustomParams(custom_value=1))
+
+    def test_select_by_name(self):
+        for name, params_cls in (('bitcoin', BitcoinMainnetParams),
+                                 ('bitcoin/mainnet', BitcoinMainnetParams),
+                                 ('bitcoin/testnet', BitcoinTestnetParams)):
+            with ChainParams(name):
+                self.assertIs(get_current_chain_params(), params_cls())
+
+    def test_attributes_are_checked(self):
+        with self.assertRaisesRegex(TypeError, 'RPC_PORT failed isinstance'):
+            class BadPortParams(BitcoinMainnetParams):
+                RPC_PORT = '8332'
+
+        with self.assertRaisesRegex(TypeError, 'NAME failed isinstance'):
+            class BadNameParams(BitcoinMainnetParams):
+                NAME = 1
+
+    def test_name_parts(self):
+        params = BitcoinTestnetParams()
+        self.assertEqual(params.name, 'bitcoin/testnet')
+        self.assertEqual(params.readable_name, 'Bitcoin testnet')
+        self.assertEqual(params.get_datadir_extra_name(), 'testnet')
+        self.assertTrue(params.get_config_path().endswith('/bitcoin.conf'))
+        self.assertEqual(BitcoinMainnetParams().readable_name, 'Bitcoin')
+        self.assertEqual(BitcoinMainnetParams().get_datadir_extra_name(), '')
+
+    def test_select_invalid(self):
+        prev_params = get_current_chain_params()
+        for invalid in ('nosuchchain', object, object(), 1):
+            with self.assertRaises(ValueError):
+                select_chain_params(invalid)
+        self.assertIs(get_current_chain_params(), prev_params)
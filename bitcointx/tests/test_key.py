@@ -11,12 +11,19 @@
 
 # pylama:ignore=E501
 
+import ctypes
 import unittest
 import logging
+import threading
 
-from bitcointx.core.key import CKey, CPubKey
-from bitcointx.core import x
-from bitcointx.core.secp256k1 import secp256k1_has_pubkey_negate
+from bitcointx.core.key import CKey, CPubKey, SignatureBatch
+from bitcointx.core import x, Hash
+from bitcointx.core.secp256k1 import (
+    _secp256k1, secp256k1_context_verify, secp256k1_has_pubkey_negate,
+    secp256k1_ecdsa_verify_batch, secp256k1_ecdsa_verify_many,
+    build_aligned_data_array, secp256k1_create_and_init_context,
+    SECP256K1_CONTEXT_SIGN
+)
 
 
 class Test_CPubKey(unittest.TestCase):
@@ -111,3 +118,114 @@ class Test_CKey(unittest.TestCase):
 
         with self.assertRaises(ValueError):
             CKey(b'\xff'*32)
+
+    def test_sign_verify_in_threads(self):
+        # sign() and verify() use per-thread scratch buffers,
+        # results must not be affected by calls in other threads
+        keys = [CKey(Hash(bytes([i]))) for i in range(4)]
+        hashes = [Hash(b'msg' + bytes([i])) for i in range(8)]
+        expected = [[k.sign(h) for h in hashes] for k in keys]
+        results = [None] * len(keys)
+
+        def thread_fn(i):
+            k = keys[i]
+            sigs = [k.sign(h) for h in hashes]
+            results[i] = (sigs, [k.pub.verify(h, sig)
+                                 for h, sig in zip(hashes, sigs)])
+
+        threads = [threading.Thread(target=thread_fn, args=(i,))
+                   for i in range(len(keys))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        for i, (sigs, verified) in enumerate(results):
+            self.assertEqual(sigs, expected[i])
+            self.assertTrue(all(verified))
+            self.assertFalse(keys[i].pub.verify(hashes[0], expected[i][1]))
+
+    def test_verify_batch(self):
+        def raw_sig(sig):
+            buf = ctypes.create_string_buffer(64)
+            result = _secp256k1.secp256k1_ecdsa_signature_parse_der(
+                secp256k1_context_verify, buf, sig, len(sig))
+            self.assertEqual(result, 1)
+            return buf.raw
+
+        keys = [CKey(Hash(bytes([i]))) for i in range(4)]
+        hashes = [Hash(b'msg' + bytes([i])) for i in range(16)]
+        items = []
+        expected = []
+        for i, h in enumerate(hashes):
+            k = keys[i % len(keys)]
+            sig = k.sign(h)
+            if i % 3 == 0:
+                # signature of a different message must not verify
+                items.append((raw_sig(sig), hashes[i-1], k.pub._to_raw().raw))
+                expected.append(False)
+            else:
+                items.append((raw_sig(sig), h, k.pub._to_raw().raw))
+                expected.append(True)
+
+        self.assertEqual(secp256k1_ecdsa_verify_batch(items), expected)
+        self.assertEqual(
+            secp256k1_ecdsa_verify_many(secp256k1_context_verify,
+                                        *[[item[n] for item in items]
+                                          for n in range(3)]),
+            expected)
+        self.assertEqual(secp256k1_ecdsa_verify_batch(items[1:2]), [True])
+        self.assertEqual(secp256k1_ecdsa_verify_batch([]), [])
+
+    def test_build_aligned_data_array(self):
+        arr = build_aligned_data_array([b'ab', b'cd', b'ef'], 2)
+        self.assertEqual(bytes(arr), b'abcdef')
+        self.assertEqual(bytes(build_aligned_data_array([], 32)), b'')
+        with self.assertRaises(ValueError):
+            build_aligned_data_array([b'ab', b'c'], 2)
+        with self.assertRaises(ValueError):
+            secp256k1_ecdsa_verify_many(secp256k1_context_verify,
+                                        [b'\x00'*64], [], [b'\x00'*64])
+
+    def test_signature_batch(self):
+        keys = [CKey(Hash(bytes([i]))) for i in range(3)]
+        hashes = [Hash(b'msg' + bytes([i])) for i in range(6)]
+        batch = SignatureBatch()
+        cases = []
+        for i, h in enumerate(hashes):
+            k = keys[i % len(keys)]
+            cases.append((k.sign(h), h, k.pub))
+        # signature of a different message
+        cases.append((cases[0][0], hashes[1], keys[0].pub))
+        # wrong pubkey
+        cases.append((cases[0][0], hashes[0], keys[1].pub))
+        # invalid DER, empty signature, invalid pubkey
+        cases.append((b'\x30\x00', hashes[0], keys[0].pub))
+        cases.append((b'', hashes[0], keys[0].pub))
+        cases.append((cases[0][0], hashes[0], CPubKey(b'\x02' + b'\x00'*32)))
+
+        for sig, h, pub in cases:
+            batch.add(sig, h, pub)
+
+        self.assertEqual(len(batch), len(cases))
+        self.assertEqual(batch.verify_all(),
+                         [pub.verify(h, sig) for sig, h, pub in cases])
+        self.assertEqual(batch.verify_all(),
+                         [True] * len(hashes) + [False] * 5)
+        self.assertEqual(SignatureBatch().verify_all(), [])
+
+        with self.assertRaises(ValueError):
+            batch.add(cases[0][0], b'\x00' * 31, keys[0].pub)
+        for invalid_pub in (33, '02ab', None):
+            with self.assertRaises(TypeError):
+                batch.add(cases[0][0], hashes[0], invalid_pub)
+        with self.assertRaises(TypeError):
+            batch.add('3000', hashes[0], keys[0].pub)
+        with self.assertRaises(TypeError):
+            batch.add(cases[0][0], list(hashes[0]), keys[0].pub)
+        self.assertEqual(len(batch), len(cases))
+
+    def test_create_context_invalid_flags(self):
+        with self.assertRaises(ValueError):
+            secp256k1_create_and_init_context(
+                _secp256k1, SECP256K1_CONTEXT_SIGN | (1 << 10))
@@ -12,9 +12,10 @@
 # pylama:ignore=E501
 
 import os
+import hashlib
 import unittest
 
-from bitcointx.core import b2x, x
+from bitcointx.core import b2x, x, Hash160
 from bitcointx.core.key import CKey
 from bitcointx.core.script import (
     CScript, CScriptOp, CScriptInvalidError,
@@ -487,6 +488,25 @@ class Test_CScript(unittest.TestCase):
         with self.assertRaises(ValueError):
             CScript([b'a' * 518]).to_p2sh_scriptPubKey()
 
+    def test_to_p2wsh_scriptPubKey(self):
+        redeemScript = CScript([1, x('029b6d2c97b8b7c718c325d7be3ac30f7c9d67651bce0c929f55ee77ce58efcf84'),
+                                1, OP_CHECKMULTISIG])
+        self.assertEqual(
+            redeemScript.to_p2wsh_scriptPubKey(),
+            CScript([0, hashlib.sha256(redeemScript).digest()]))
+        self.assertTrue(redeemScript.to_p2wsh_scriptPubKey()
+                        .is_witness_v0_scripthash())
+
+        with self.assertRaises(ValueError):
+            CScript([b'a' * 518]).to_p2wsh_scriptPubKey()
+
+    def test_to_p2wpkh_scriptPubKey(self):
+        pubkey = CScript(x('029b6d2c97b8b7c718c325d7be3ac30f7c9d67651bce0c929f55ee77ce58efcf84'))
+        self.assertEqual(b2x(pubkey.to_p2wpkh_scriptPubKey()),
+                         '0014' + b2x(Hash160(pubkey)))
+        self.assertTrue(pubkey.to_p2wpkh_scriptPubKey()
+                        .is_witness_v0_keyhash())
+
     def test_guards(self):
         bt = b'a'
         nr = 42
@@ -508,6 +528,15 @@ class Test_CScript(unittest.TestCase):
         self.assertEqual(CScript([NUMBER(nr)]), CScript([nr]))
         self.assertEqual(CScript([OPCODE(op)]), CScript([op]))
 
+    def test_no_bool_use_as_property(self):
+        script = CScript(x('a914000000000000000000000000000000000000000087'))
+        self.assertTrue(script.is_p2sh())
+        self.assertFalse(script.is_p2pkh())
+        with self.assertRaisesRegex(TypeError, r'CBitcoinScript\(\)\.is_p2sh\(\)'):
+            bool(script.is_p2sh)
+        with self.assertRaisesRegex(TypeError, r'CBitcoinScript\.is_p2sh\(\)'):
+            int(CScript.is_p2sh)
+
 
 class Test_IsLowDERSignature(unittest.TestCase):
     def test_high_s_value(self):
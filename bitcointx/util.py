@@ -21,11 +21,20 @@ class_mapping_dispatch_data.script = None
 
 
 class _NoBoolCallable():
-    __slots__ = ['method_name', 'method']
+    __slots__ = ['method', 'owner', 'is_bound']
 
-    def __init__(self, name, method):
-        self.method_name = name
+    def __init__(self, method, owner, is_bound):
         self.method = method
+        self.owner = owner
+        self.is_bound = is_bound
+
+    @property
+    def method_name(self):
+        # The name is only needed for the error message, so it is
+        # not computed on each attribute access
+        return '{}{}.{}'.format(self.owner.__name__,
+                                '()' if self.is_bound else '',
+                                self.method.__name__)
 
     def __int__(self):
         raise TypeError(
@@ -49,15 +58,8 @@ class no_bool_use_as_property():
         self.method = method
 
     def __get__(self, instance, owner):
-        method = self.method.__get__(instance, owner)
-
-        def wrapper(*args, **kwargs):
-            return method(*args, **kwargs)
-
-        name = '{}{}.{}'.format(owner.__name__,
-                                '' if instance is None else '()',
-                                method.__name__)
-        return _NoBoolCallable(name, wrapper)
+        return _NoBoolCallable(self.method.__get__(instance, owner), owner,
+                               instance is not None)
 
 
 def get_class_dispatcher_depends(dclass):
@@ -193,6 +195,10 @@ class ClassMappingDispatcher(ABCMeta):
         mcs._class_dispatcher__final_dispatch = set()
         mcs._class_dispatcher__no_direct_use = False
         mcs._class_dispatcher__clsmap = {}
+        # The classes from clsmap that have exactly one target class.
+        # __call__ and __getattribute__ are invoked very often,
+        # and with this map they need only one lookup to find the target.
+        mcs._class_dispatcher__single_target_map = {}
 
         if depends:
             parent_depends = mcs._class_dispatcher__depends
@@ -343,6 +349,24 @@ class ClassMappingDispatcher(ABCMeta):
             # assign to the map in case this is first time
             mcs._class_dispatcher__clsmap[bcs] = target_list
 
+            if len(target_list) == 1:
+                mcs._class_dispatcher__single_target_map[bcs] = cls
+            else:
+                mcs._class_dispatcher__single_target_map.pop(bcs, None)
+
+    def __instancecheck__(cls, instance):
+        # Actual subclasses are checked by type's own (fast) check first,
+        # ABCMeta's check is only needed for the registered virtual
+        # subclasses.
+        if type.__instancecheck__(cls, instance):
+            return True
+        return super().__instancecheck__(instance)
+
+    def __subclasscheck__(cls, subclass):
+        if type.__subclasscheck__(cls, subclass):
+            return True
+        return super().__subclasscheck__(subclass)
+
     def __call__(cls, *args, **kwargs):
         """Perform class mapping in accordance to the currently active
         dispatcher class"""
@@ -352,35 +376,42 @@ class ClassMappingDispatcher(ABCMeta):
         if cur_dispatcher is None:
             return type.__call__(cls, *args, **kwargs)
 
-        class_list = cur_dispatcher._class_dispatcher__clsmap.get(cls, [])
-        if len(class_list) != 1:
-            # There is more than one target, so this is not
-            # a final mapping. Instantiate the original class, and allow
-            # it to do its own dispatching.
+        target_cls = cur_dispatcher._class_dispatcher__single_target_map.get(
+            cls)
+        if target_cls is None:
+            # There is no target, or there is more than one target,
+            # so this is not a final mapping. Instantiate the original
+            # class, and allow it to do its own dispatching.
             return type.__call__(cls, *args, **kwargs)
         # Unambigous target - do the substitution.
-        return type.__call__(class_list[0], *args, **kwargs)
+        return type.__call__(target_cls, *args, **kwargs)
 
     def __getattribute__(cls, name):
         """Perform class attribute mapping in accordance to the currently
         active dispatcher class (except python-specific attributes)"""
         if name.startswith('__') and name.endswith('__'):
             return type.__getattribute__(cls, name)
+        if name.startswith('_abc_'):
+            # The data of ABCMeta, used on each isinstance() and issubclass()
+            # check. It belongs to the class itself, and must not be
+            # taken from the dispatch target.
+            return type.__getattribute__(cls, name)
         mcs = type(cls)
         cur_dispatcher = getattr(class_mapping_dispatch_data,
                                  mcs._class_dispatcher__identity)
         if cur_dispatcher is None:
             return type.__getattribute__(cls, name)
 
-        class_list = cur_dispatcher._class_dispatcher__clsmap.get(cls, [])
-        if len(class_list) != 1:
-            # There is more than one target, so this is not
-            # a final mapping. The original class is doing
+        target_cls = cur_dispatcher._class_dispatcher__single_target_map.get(
+            cls)
+        if target_cls is None:
+            # There is no target, or there is more than one target,
+            # so this is not a final mapping. The original class is doing
             # its own dispatching, and we do not need to do any
             # attribute substition here.
             return type.__getattribute__(cls, name)
         # Unambigous target - do the substitution.
-        return getattr(class_list[0], name)
+        return getattr(target_cls, name)
 
 
 class classgetter:
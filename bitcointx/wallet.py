@@ -18,6 +18,7 @@ scriptPubKeys; currently there is no actual wallet support implemented.
 
 # pylama:ignore=E501,E221
 
+import functools
 from io import BytesIO
 
 import bitcointx
@@ -32,13 +33,24 @@ from bitcointx.core.key import (
     CPubKey, CKeyBase, CExtKeyBase, CExtPubKeyBase
 )
 from bitcointx.core.script import (
-    CScript, OP_HASH160, OP_DUP, OP_EQUALVERIFY, OP_CHECKSIG, OP_EQUAL
+    CScript, OP_HASH160, OP_DUP, OP_EQUALVERIFY, OP_CHECKSIG, OP_EQUAL,
+    _P2SH_SPK_PREFIX, _P2SH_SPK_SUFFIX, _P2PKH_SPK_PREFIX, _P2PKH_SPK_SUFFIX,
+    _P2WPKH_SPK_PREFIX, _P2WSH_SPK_PREFIX
 )
 
 
+# Tables of concrete address classes for from_scriptPubKey(), for each of
+# the classes it was called on. Cleared each time a new wallet class
+# is defined, because the dispatcher might map it to some address class.
+_scriptpubkey_dispatch_tables = {}
+
+
 class WalletCoinClassDispatcher(ClassMappingDispatcher, identity='wallet',
                                 depends=[bitcointx.core.CoreCoinClassDispatcher]):
-    ...
+
+    def __init__(cls, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        _scriptpubkey_dispatch_tables.clear()
 
 
 class WalletBitcoinClassDispatcher(
@@ -75,12 +87,101 @@ class WalletBitcoinRegtestClass(WalletBitcoinClass,
     ...
 
 
+# The number of results to cache for each of from_scriptPubKey() methods
+# of the concrete address classes
+_FROM_SCRIPTPUBKEY_CACHE_SIZE = 4096
+
+
+def _cached_from_scriptPubKey(fn):
+    """Cache the addresses created by from_scriptPubKey() classmethod.
+    The same scriptPubKey is often seen many times, and the result
+    depends only on the class and the script, both immutable.
+    Exceptions are not cached, so failed conversions are repeated.
+
+    The cached address instances are shared between the callers,
+    so they should not be modified, for example by setting attributes
+    on them. Only the methods of concrete address classes are cached,
+    the generic CCoinAddress.from_scriptPubKey() relies on them."""
+
+    @functools.lru_cache(maxsize=_FROM_SCRIPTPUBKEY_CACHE_SIZE)
+    def cached_fn(cls, scriptPubKey):
+        return fn(cls, scriptPubKey)
+
+    @functools.wraps(fn)
+    def wrapper(cls, scriptPubKey):
+        if not isinstance(scriptPubKey, CScript):
+            return fn(cls, scriptPubKey)
+        return cached_fn(cls, scriptPubKey)
+
+    return wrapper
+
+
+def _get_scriptpubkey_dispatch_table(cls):
+    """Return a dict that maps (first byte, length) of scriptPubKey
+    to the tuple of address classes that can be created from such
+    scriptPubKey. The classes that do not declare _scriptpubkey_shape
+    are put under None key, and should be tried for any scriptPubKey"""
+    try:
+        return _scriptpubkey_dispatch_tables[cls]
+    except KeyError:
+        pass
+
+    table = {}
+    any_shape = []
+    stack = list(reversed(dispatcher_mapped_list(cls)))
+    while stack:
+        candidate = stack.pop()
+        mapped = dispatcher_mapped_list(candidate)
+        if mapped:
+            stack.extend(reversed(mapped))
+        elif candidate._scriptpubkey_shape is None:
+            any_shape.append(candidate)
+        else:
+            table.setdefault(candidate._scriptpubkey_shape, []).append(
+                candidate)
+
+    table = {shape: tuple(candidates + any_shape)
+             for shape, candidates in table.items()}
+    table[None] = tuple(any_shape)
+    _scriptpubkey_dispatch_tables[cls] = table
+    return table
+
+
+def _order_address_candidates(target_cls_set, s):
+    """Return the classes to try to decode address string s with.
+    Bech32 decoding can only succeed if the human-readable part of
+    the string matches bech32_hrp of the class, and this is cheap to check
+    without decoding. The classes with non-matching bech32_hrp are skipped,
+    and the class with matching one is put first, so that bech32 addresses
+    are not needlessly decoded as base58 first"""
+    hrp = None
+    if isinstance(s, str):
+        sep_pos = s.rfind('1')
+        if sep_pos > 0:
+            hrp = s[:sep_pos].lower()
+
+    matched = []
+    others = []
+    for target_cls in target_cls_set:
+        target_hrp = getattr(target_cls, 'bech32_hrp', None)
+        if target_hrp is None:
+            others.append(target_cls)
+        elif target_hrp == hrp:
+            matched.append(target_cls)
+
+    return matched + others
+
+
 class CCoinAddress(WalletCoinClass):
 
+    # (first byte, length) of the scriptPubKeys that the address class
+    # can be created from, set for the concrete address types
+    _scriptpubkey_shape = None
+
     def __new__(cls, s):
         recognized_encoding = []
         target_cls_set = dispatcher_mapped_list(cls)
-        for target_cls in target_cls_set:
+        for target_cls in _order_address_candidates(target_cls_set, s):
             try:
                 return target_cls(s)
             except CCoinAddressError:
@@ -99,8 +200,19 @@ class CCoinAddress(WalletCoinClass):
 
     @classmethod
     def from_scriptPubKey(cls, scriptPubKey):
-        """Convert a scriptPubKey to a subclass of CCoinAddress"""
-        for candidate in dispatcher_mapped_list(cls):
+        """Convert a scriptPubKey to a subclass of CCoinAddress
+
+        The concrete address classes cache the results, so the same
+        address instance may be returned for the same scriptPubKey
+        on different calls. It should not be modified."""
+        table = _get_scriptpubkey_dispatch_table(cls)
+        if len(scriptPubKey):
+            candidates = table.get((scriptPubKey[0], len(scriptPubKey)),
+                                   table[None])
+        else:
+            candidates = table[None]
+
+        for candidate in candidates:
             try:
                 return candidate.from_scriptPubKey(scriptPubKey)
             except CCoinAddressError:
@@ -109,6 +221,36 @@ class CCoinAddress(WalletCoinClass):
         raise CCoinAddressError(
             'scriptPubKey is not in a recognized address format')
 
+    @classmethod
+    def from_scriptPubKeys(cls, scriptPubKeys):
+        """Convert a sequence of scriptPubKeys to a list of addresses,
+        in the same order.
+
+        Scripts of the same length and with the same first byte are
+        usually of the same type. The class that was found for the first
+        script of such shape is tried first for the subsequent ones,
+        so that they do not need to go through all the candidate classes.
+
+        Raises CCoinAddressError if any of the scriptPubKeys is not
+        in a recognized address format"""
+        addresses = []
+        class_by_shape = {}
+        for scriptPubKey in scriptPubKeys:
+            shape = (len(scriptPubKey), scriptPubKey[:1])
+            target_cls = class_by_shape.get(shape)
+            if target_cls is not None:
+                try:
+                    addresses.append(target_cls.from_scriptPubKey(scriptPubKey))
+                    continue
+                except CCoinAddressError:
+                    pass
+
+            addr = cls.from_scriptPubKey(scriptPubKey)
+            class_by_shape[shape] = addr.__class__
+            addresses.append(addr)
+
+        return addresses
+
     @classmethod
     def get_output_size(cls_or_inst):
         if isinstance(cls_or_inst, type):
@@ -217,12 +359,9 @@ class CBech32CoinAddress(bitcointx.bech32.CBech32Data, CCoinAddress):
                 'witness program does not match {}'
                 ' expected length or version'.format(cls.__name__))
 
-        self = super(CBech32CoinAddress, cls).from_bytes(
-            bytes(witprog), witver=candidate._witness_version
+        return super(CBech32CoinAddress, candidate).from_bytes(
+            witprog, witver=candidate._witness_version
         )
-        self.__class__ = candidate
-
-        return self
 
 
 class CBase58DataDispatched(bitcointx.base58.CBase58Data):
@@ -247,6 +386,7 @@ class CBase58CoinAddress(CBase58DataDispatched, CCoinAddress):
 class P2SHCoinAddress(CBase58CoinAddress, next_dispatch_final=True):
     _data_length = 20
     _scriptpubkey_type = 'scripthash'
+    _scriptpubkey_shape = (OP_HASH160, 23)
 
     @classmethod
     def from_redeemScript(cls, redeemScript):
@@ -257,11 +397,16 @@ class P2SHCoinAddress(CBase58CoinAddress, next_dispatch_final=True):
         return cls.from_scriptPubKey(redeemScript.to_p2sh_scriptPubKey())
 
     @classmethod
+    @_cached_from_scriptPubKey
     def from_scriptPubKey(cls, scriptPubKey):
         """Convert a scriptPubKey to a P2SH address
 
         Raises CCoinAddressError if the scriptPubKey isn't of the correct
         form.
+
+        The results are cached: the same address instance is returned
+        for equal scriptPubKeys, and is shared between all the callers.
+        The returned instance must not be modified.
         """
         if scriptPubKey.is_p2sh():
             return cls.from_bytes(scriptPubKey[2:22])
@@ -271,6 +416,8 @@ class P2SHCoinAddress(CBase58CoinAddress, next_dispatch_final=True):
 
     def to_scriptPubKey(self):
         """Convert an address to a scriptPubKey"""
+        if len(self) == 20:
+            return CScript(_P2SH_SPK_PREFIX + self + _P2SH_SPK_SUFFIX)
         return CScript([OP_HASH160, self, OP_EQUAL])
 
     def to_redeemScript(self):
@@ -280,6 +427,7 @@ class P2SHCoinAddress(CBase58CoinAddress, next_dispatch_final=True):
 class P2PKHCoinAddress(CBase58CoinAddress, next_dispatch_final=True):
     _data_length = 20
     _scriptpubkey_type = 'pubkeyhash'
+    _scriptpubkey_shape = (OP_DUP, 25)
 
     @classmethod
     def from_pubkey(cls, pubkey, accept_invalid=False):
@@ -300,14 +448,28 @@ class P2PKHCoinAddress(CBase58CoinAddress, next_dispatch_final=True):
             if not pubkey.is_fullyvalid():
                 raise P2PKHCoinAddressError('invalid pubkey')
 
-        pubkey_hash = bitcointx.core.Hash160(pubkey)
-        return cls.from_bytes(pubkey_hash)
+        return cls.from_valid_pubkey(pubkey)
 
     @classmethod
+    def from_valid_pubkey(cls, pubkey):
+        """Create a P2PKH address from a pubkey that is known to be valid
+
+        No checks are done on pubkey. The caller must ensure that it is
+        a fully valid public key, like a CPubKey instance for which
+        is_fullyvalid() is True. Use from_pubkey() if unsure.
+        """
+        return cls.from_bytes(bitcointx.core.Hash160(pubkey))
+
+    @classmethod
+    @_cached_from_scriptPubKey
     def from_scriptPubKey(cls, scriptPubKey):
         """Convert a scriptPubKey to a P2PKH address
         Raises CCoinAddressError if the scriptPubKey isn't of the correct
         form.
+
+        The results are cached: the same address instance is returned
+        for equal scriptPubKeys, and is shared between all the callers.
+        The returned instance must not be modified.
         """
         if scriptPubKey.is_p2pkh():
             return cls.from_bytes(scriptPubKey[3:23])
@@ -316,6 +478,8 @@ class P2PKHCoinAddress(CBase58CoinAddress, next_dispatch_final=True):
 
     def to_scriptPubKey(self):
         """Convert an address to a scriptPubKey"""
+        if len(self) == 20:
+            return CScript(_P2PKH_SPK_PREFIX + self + _P2PKH_SPK_SUFFIX)
         return CScript([OP_DUP, OP_HASH160, self, OP_EQUALVERIFY, OP_CHECKSIG])
 
     def to_redeemScript(self):
@@ -330,13 +494,19 @@ class P2WSHCoinAddress(CBech32CoinAddress, next_dispatch_final=True):
     _data_length = 32
     _witness_version = 0
     _scriptpubkey_type = 'witness_v0_scripthash'
+    _scriptpubkey_shape = (0, 34)
 
     @classmethod
+    @_cached_from_scriptPubKey
     def from_scriptPubKey(cls, scriptPubKey):
         """Convert a scriptPubKey to a P2WSH address
 
         Raises CCoinAddressError if the scriptPubKey isn't of the correct
         form.
+
+        The results are cached: the same address instance is returned
+        for equal scriptPubKeys, and is shared between all the callers.
+        The returned instance must not be modified.
         """
         if scriptPubKey.is_witness_v0_scripthash():
             return cls.from_bytes(scriptPubKey[2:34])
@@ -354,6 +524,8 @@ class P2WSHCoinAddress(CBech32CoinAddress, next_dispatch_final=True):
 
     def to_scriptPubKey(self):
         """Convert an address to a scriptPubKey"""
+        if len(self) == 32:
+            return CScript(_P2WSH_SPK_PREFIX + self)
         return CScript([0, self])
 
     def to_redeemScript(self):
@@ -365,6 +537,7 @@ class P2WPKHCoinAddress(CBech32CoinAddress, next_dispatch_final=True):
     _data_length = 20
     _witness_version = 0
     _scriptpubkey_type = 'witness_v0_keyhash'
+    _scriptpubkey_shape = (0, 22)
 
     @classmethod
     def from_pubkey(cls, pubkey, accept_invalid=False):
@@ -385,15 +558,29 @@ class P2WPKHCoinAddress(CBech32CoinAddress, next_dispatch_final=True):
             if not pubkey.is_fullyvalid():
                 raise P2PKHCoinAddressError('invalid pubkey')
 
-        pubkey_hash = bitcointx.core.Hash160(pubkey)
-        return cls.from_bytes(pubkey_hash)
+        return cls.from_valid_pubkey(pubkey)
 
     @classmethod
+    def from_valid_pubkey(cls, pubkey):
+        """Create a P2WPKH address from a pubkey that is known to be valid
+
+        No checks are done on pubkey. The caller must ensure that it is
+        a fully valid public key, like a CPubKey instance for which
+        is_fullyvalid() is True. Use from_pubkey() if unsure.
+        """
+        return cls.from_bytes(bitcointx.core.Hash160(pubkey))
+
+    @classmethod
+    @_cached_from_scriptPubKey
     def from_scriptPubKey(cls, scriptPubKey):
         """Convert a scriptPubKey to a P2WPKH address
 
         Raises CCoinAddressError if the scriptPubKey isn't of the correct
         form.
+
+        The results are cached: the same address instance is returned
+        for equal scriptPubKeys, and is shared between all the callers.
+        The returned instance must not be modified.
         """
         if scriptPubKey.is_witness_v0_keyhash():
             return cls.from_bytes(scriptPubKey[2:22])
@@ -402,11 +589,14 @@ class P2WPKHCoinAddress(CBech32CoinAddress, next_dispatch_final=True):
 
     def to_scriptPubKey(self):
         """Convert an address to a scriptPubKey"""
+        if len(self) == 20:
+            return CScript(_P2WPKH_SPK_PREFIX + self)
         return CScript([0, self])
 
     def to_redeemScript(self):
-        return CScript([OP_DUP, OP_HASH160, self,
-                        OP_EQUALVERIFY, OP_CHECKSIG])
+        if len(self) == 20:
+            return CScript(_P2PKH_SPK_PREFIX + self + _P2PKH_SPK_SUFFIX)
+        return CScript([OP_DUP, OP_HASH160, self, OP_EQUALVERIFY, OP_CHECKSIG])
 
     @classmethod
     def from_redeemScript(cls, redeemScript):